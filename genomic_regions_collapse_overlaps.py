@@ -1,18 +1,62 @@
 #!/usr/bin/env python
-import sys, re
-
-synopsis = "\ncollapse_overlaps_among_regions.py <region_table.list> <N> <output.txt>\n\n\
-# from a <region_table.list> sorted based on start positions, print out new coordinates with overlap collapsed to <output.txt>;\n\
-# <region_table.list> should have the chromosome ID, start, and end positions at the <N>, (<N>+1), and (<N>+2)th columns, tab-delimited;\n\
-# <region_table.list> should be sorted ascending according to <start_pos> and <chromosome_ID>;\n\
-# for each line in <region_table.list>, the larger between <end_position> of the previous line and <start_pos>, will be kept as <new_start_pos> ...  ;\n\
-# and the larger between <end_position> of the previous line and <end_pos>, will be kept as <new_end_pos> ;\n\
-# if <new_end_pos> is larger than <new_start_pos>, <new_len_region> will be <new_end_pos> - <new_start_pos> + 1 ;\n\
-# if <new_end_pos> == <new_start_pos>, <new_len_region> will be 0  ;\n\
-# <output.txt>: will contain all lines from <region_table.list> plus 4 new columns for <chrID>, <new_start_pos>, <new_end_pos>, and <new_len_region>, tab-delimited. \n\n\
+import sys, heapq, tempfile, argparse
+from argparse import RawTextHelpFormatter
+
+###################################################
+### 0. script description and parsing arguments ###
+###################################################
+synopsis1 = "\
+  from a <region_table.list> sorted based on start positions, print out new\n\
+  coordinates with overlap collapsed to <output.txt>."
+
+synopsis2 = "detailed description:\n\
+ 1. Input:\n\
+  - <region_table.list> should have the chromosome ID, start, and end positions\n\
+     at the <N>, (<N>+1), and (<N>+2)th columns, tab-delimited;\n\
+  - <region_table.list> should be sorted ascending according to <start_pos> and\n\
+     <chromosome_ID>, unless '-u' is used;\n\
+ 2. Collapsing overlaps:\n\
+  - for each line in <region_table.list>, the larger between <end_position> of\n\
+     the previous line and <start_pos>, will be kept as <new_start_pos> ...  ;\n\
+  - and the larger between <end_position> of the previous line and <end_pos>,\n\
+     will be kept as <new_end_pos> ;\n\
+  - if <new_end_pos> is larger than <new_start_pos>, <new_len_region> will be\n\
+     <new_end_pos> - <new_start_pos> + 1 ;\n\
+  - if <new_end_pos> == <new_start_pos>, <new_len_region> will be 0  ;\n\
+ 3. Output:\n\
+  - <output.txt>: will contain all lines from <region_table.list> plus 4 new\n\
+     columns for <chrID>, <new_start_pos>, <new_end_pos>, and <new_len_region>,\n\
+     tab-delimited;\n\
+  - lines of <output.txt> are written in batches of 10000; only columns up to\n\
+     (<N>+2) are split from each line of <region_table.list>.\n\
+ 4. Options:\n\
+  - '-u'|'--unsorted': accept <region_table.list> in any order; regions are\n\
+     grouped by chromosome ID and sorted by start (lines with the same start\n\
+     keep their input order) internally, and lines are printed in the original\n\
+     input order, with the same 4 new columns as for a sorted input;\n\
+     <region_table.list> is read twice;\n\
+  - '-M MAX_LINES': with '-u', keep at most MAX_LINES regions in memory; larger\n\
+     tables are sorted in runs written to temporary files and merged [10000000];\n\
+  - '-T TEMP_DIR': folder for the temporary files of '-M' [system default].\n\
+  - '-m'|'--merge': instead, print one line per merged region (union of\n\
+     overlapping regions), with <chrID>, <start>, <end>, <number of regions>,\n\
+     and <merged_len>, tab-delimited, in a single pass; can be used with '-u';\n\
+  - '-c COL': with '-m', also print values in the COL-th column (e.g. IDs) of\n\
+     the merged regions, joined by ',' as the last column.\n\
+  - '-g <genome_lengths>': instead, given chromosome IDs and lengths in the\n\
+     first two columns of <genome_lengths>, print regions NOT covered by any\n\
+     region (gaps; e.g. intergenic space) to <output.txt> as <chrID>, <start>,\n\
+     <end>, and <length>, and covered and uncovered nucleotides per chromosome\n\
+     to <output.txt>.coverage, in a single pass over merged regions; regions\n\
+     beyond chromosome ends are clipped; chromosomes without any region are\n\
+     printed last as a single gap; can be used with '-u'.\n\
 ## copyleft by ohdongha@gmail.com\n"
 
 #version_history
+# 20261019 faster parsing (split only up to the <N>+2-th column, no regex) and batched writing
+# 20261019 '-g' option to print uncovered regions and coverage per chromosome
+# 20261019 '-m' and '-c' options to print merged regions
+# 20261019 '-u' option to accept unsorted input, with '-M' for sorting in bounded memory; use argparse
 # 20211115 made compatible with Python3
 # 20201114 script renamed to 'genomics_regions_collapse_overlaps.py'\n\
 # 20191011 if the 1st line looks like a header, add new column headings\n\
@@ -22,13 +66,126 @@ synopsis = "\ncollapse_overlaps_among_regions.py <region_table.list> <N> <output
 # 20150811 ver 1.1\n\
 # 20150801 ver 1.0\n\
 
-try: 
-	fin_list = open(sys.argv[1], "r")
-	chromosome_column_index = int(sys.argv[2])
-	fout = open(sys.argv[3], "w")
-except (ValueError, IndexError) :
-	print( synopsis )
-	sys.exit(0)
+parser = argparse.ArgumentParser(description = synopsis1, epilog = synopsis2, formatter_class = RawTextHelpFormatter)
+
+# positional parameters
+parser.add_argument('region_table', type=str, help="See below")
+parser.add_argument('N', type=int)
+parser.add_argument('output', type=str)
+
+# options
+parser.add_argument('-u', '--unsorted', action="store_true", default=False)
+parser.add_argument('-M', dest="max_lines", type=int, default=10000000)
+parser.add_argument('-T', dest="temp_dir", type=str, default=None)
+parser.add_argument('-m', '--merge', action="store_true", default=False)
+parser.add_argument('-c', dest="column", type=int, default=0)
+parser.add_argument('-g', dest="genome_lengths", type=str, default="")
+
+args = parser.parse_args()
+
+fin_list = open(args.region_table, "r")
+chromosome_column_index = args.N
+fout = open(args.output, "w")
+
+#function to sort records (tuples), in memory if there are at most max_lines of them; otherwise sorted runs
+# of max_lines records are written to temporary files and merged; types = type of each field in a record
+def sort_records(records, types):
+	runs = []
+	buffer = []
+	for record in records:
+		buffer.append(record)
+		if len(buffer) >= args.max_lines:
+			buffer.sort()
+			runs.append( write_run(buffer) )
+			buffer = []
+	buffer.sort()
+	if not runs:
+		return iter(buffer)
+	runs.append( write_run(buffer) )
+	return heapq.merge( *[ read_run(run, types) for run in runs ] )
+
+def write_run(records):
+	run = tempfile.TemporaryFile(mode='w+', dir=args.temp_dir)
+	for record in records:
+		run.write( '\t'.join( str(field) for field in record ) + '\n' )
+	run.seek(0)
+	return run
+
+def read_run(run, types):
+	for line in run:
+		yield tuple( t(field) for t, field in zip( types, line.rstrip('\n').split('\t') ) )
+	run.close()
+
+#function to parse chromosome ID, start, and end positions from a line; raises ValueError or IndexError if not valid
+def parse_region(line):
+	tok = line.split('\t', chromosome_column_index + 2) # split only up to the end position column
+	ChrID = tok[chromosome_column_index - 1].strip()
+	start_position = int( tok[chromosome_column_index] ) # int() ignores surrounding spaces
+	end_position = int( tok[chromosome_column_index + 1] )
+	if ( end_position < start_position ): # don't raise error if e == s
+		raise ValueError()
+	return ChrID, start_position, end_position
+
+#function to read regions as (ChrID, start, line number, end, value in '-c' column) from <region_table.list>
+def regions_in_list():
+	num_line = 0
+	for line in fin_list:
+		num_line += 1
+		try :
+			ChrID, start_position, end_position = parse_region(line)
+			value = ""
+			if args.column > 0:
+				value = line.split('\t')[args.column - 1].strip()
+		except (ValueError, IndexError):
+			continue
+		yield ( ChrID, start_position, num_line, end_position, value )
+
+#function to merge overlapping regions from a stream sorted by ChrID and start; yields
+# (ChrID, start, end, number of regions, list of values in '-c' column) per merged region
+def merged_regions(regions):
+	global Lines, LinesWithOverlap
+	merged_ChrID = None
+	merged_start = merged_end = 0
+	merged_count = 0
+	merged_values = []
+	for ChrID, start_position, num_line, end_position, value in regions:
+		if ChrID == merged_ChrID and start_position <= merged_end:
+			merged_end = max(merged_end, end_position)
+			merged_count += 1
+			LinesWithOverlap = LinesWithOverlap + 1
+		else:
+			if merged_ChrID is not None:
+				yield merged_ChrID, merged_start, merged_end, merged_count, merged_values
+			merged_ChrID, merged_start, merged_end, merged_count = ChrID, start_position, end_position, 1
+			merged_values = []
+		if args.column > 0:
+			merged_values.append(value)
+		Lines = Lines + 1
+		if ( Lines % 10000 == 0):
+			sys.stdout.write("\r   processing %d+ lines" % (Lines))
+			sys.stdout.flush()
+	if merged_ChrID is not None:
+		yield merged_ChrID, merged_start, merged_end, merged_count, merged_values
+
+#function to read regions from a sorted <region_table.list>, stopping if not sorted
+def regions_in_sorted_list():
+	previous_ChrID = None
+	previous_start_position = 0
+	done_ChrID_set = set()
+	for region in regions_in_list():
+		ChrID, start_position = region[0], region[1]
+		if ChrID != previous_ChrID:
+			if ChrID in done_ChrID_set:
+				print( "\n The input file appears not properly sorted at line number %d; use '-u' for unsorted input, exiting.\n" % region[2] )
+				sys.exit(1)
+			done_ChrID_set.add(ChrID)
+		elif start_position < previous_start_position:
+			print( "\n The input file appears not properly sorted at line number %d; use '-u' for unsorted input, exiting.\n" % region[2] )
+			sys.exit(1)
+		previous_ChrID = ChrID
+		previous_start_position = start_position
+		yield region
+
 
 print( "reading %s," % fin_list.name )
 ### reading and processing lines in <region_table.list> and print to <output.txt>
@@ -42,51 +199,177 @@ previous_ChrID = ""
 previous_start_position = 0
 previous_end_position = 0
 
-for line in fin_list:
-	try :
-		tok = re.split('\t', line)
-		ChrID = tok[chromosome_column_index - 1].strip()
-		start_position = int( tok[chromosome_column_index].strip() )
-		end_position = int( tok[chromosome_column_index + 1].strip() )
-		if ( (ChrID == previous_ChrID) and (start_position < previous_start_position) ):
-			print( "\n The input file appears not properly sorted at line number", str(Lines), "\n" )
-			print( "\n Exiting, without further processing.\n" )
-			break				
-#		if ( end_position <= start_position ):
-		if ( end_position < start_position ): # don't raise error if e == s
-			raise ValueError()
-		if ( ChrID != previous_ChrID):  ## dealing with the first line of each chromosome
-			previous_start_position = start_position
-			previous_end_position = end_position
-			previous_ChrID = ChrID
-			fout.write(line.strip()  + '\t' + ChrID + '\t' + str( start_position ) + '\t' + str( end_position ) + '\t' + str( end_position - start_position + 1 ) + '\n')
+if args.merge or args.genome_lengths:
+	if args.unsorted:
+		regions = sort_records( regions_in_list(), (str, int, int, int, str) )
+	else:
+		regions = regions_in_sorted_list()
+	MergedRegions = 0
+
+if args.genome_lengths:
+	### with '-g': print uncovered regions (gaps) and covered bp per chromosome
+	len_dict = dict() # key = ChrID, value = length
+	with open(args.genome_lengths, "r") as fin_lengths:
+		for line in fin_lengths:
+			tok = line.split('\t')
+			try :
+				len_dict[ tok[0].strip() ] = int( tok[1].strip() )
+			except (ValueError, IndexError):
+				print( "skipping a line in %s: %s" % (args.genome_lengths, line.strip()) )
+	fout_coverage = open(args.output + ".coverage", "w")
+	fout_coverage.write( "ChrID\tlength\tcovered\tuncovered\tfraction_covered\n" )
+
+	#function to print the gap after the last merged region and the coverage of a chromosome
+	def finish_chr(ChrID, gap_start, covered):
+		if ChrID in len_dict:
+			if gap_start <= len_dict[ChrID]:
+				fout.write( "%s\t%d\t%d\t%d\n" % (ChrID, gap_start, len_dict[ChrID], len_dict[ChrID] - gap_start + 1) )
+			fout_coverage.write( "%s\t%d\t%d\t%d\t%.4f\n" % (ChrID, len_dict[ChrID], covered, len_dict[ChrID] - covered, covered / float( max(len_dict[ChrID], 1) )) )
 		else:
-			if( start_position < previous_end_position):
-				LinesWithOverlap = LinesWithOverlap + 1				
-			previous_start_position = start_position
-			if start_position <= previous_end_position: # 190603
-				start_position = previous_end_position + 1
-#			start_position = max(start_position, previous_end_position)
-			end_position = max(end_position, previous_end_position)
-			previous_end_position = end_position
-			previous_ChrID = ChrID
-			if ( start_position < end_position): # 190603
-#			if ( start_position != end_position): 
-				fout.write(line.strip() + '\t' + ChrID + '\t' + str( start_position ) + '\t' + str( end_position ) + '\t' + str( end_position - start_position + 1 ) + '\n')
+			print( "\nchromosome ID %s not in %s; printing gaps up to its last region only," % (ChrID, args.genome_lengths) )
+			fout_coverage.write( "%s\tNA\t%d\tNA\tNA\n" % (ChrID, covered) )
+
+	current_ChrID = None
+	gap_start = 1 # first position not yet covered in current_ChrID
+	covered = 0
+	done_ChrID_set = set()
+	for ChrID, merged_start, merged_end, merged_count, merged_values in merged_regions(regions):
+		if ChrID != current_ChrID:
+			if current_ChrID is not None:
+				finish_chr(current_ChrID, gap_start, covered)
+			current_ChrID = ChrID
+			done_ChrID_set.add(ChrID)
+			gap_start = 1
+			covered = 0
+		if ChrID in len_dict: # clip regions beyond the chromosome end
+			merged_end = min(merged_end, len_dict[ChrID])
+			merged_start = max(merged_start, 1)
+			if merged_start > merged_end:
+				continue
+		if merged_start > gap_start:
+			fout.write( "%s\t%d\t%d\t%d\n" % (ChrID, gap_start, merged_start - 1, merged_start - gap_start) )
+		covered += merged_end - max(merged_start, gap_start) + 1
+		gap_start = merged_end + 1
+		MergedRegions = MergedRegions + 1
+	if current_ChrID is not None:
+		finish_chr(current_ChrID, gap_start, covered)
+	for ChrID in len_dict: # chromosomes without any region
+		if ChrID not in done_ChrID_set:
+			finish_chr(ChrID, 1, 0)
+	fout_coverage.close()
+	print( "\r%d regions were merged into %d; gaps printed to %s and coverage to %s" % (Lines - 1, MergedRegions, args.output, fout_coverage.name) )
+
+elif args.merge:
+	### with '-m': print one line per merged region
+	for ChrID, merged_start, merged_end, merged_count, merged_values in merged_regions(regions):
+		fout.write( "%s\t%d\t%d\t%d\t%d" % (ChrID, merged_start, merged_end, merged_count, merged_end - merged_start + 1) + \
+			( '\t' + ','.join(merged_values) if args.column > 0 else "" ) + '\n' )
+		MergedRegions = MergedRegions + 1
+	print( "\r%d regions were merged into %d" % (Lines - 1, MergedRegions) )
+
+elif args.unsorted:
+	### with '-u': sort regions per chromosome by start, collapse, then print lines in the input order
+	# (1) regions as (ChrID, start, line number, end, value), sorted
+	# (2) collapsed columns as (line number, ChrID, new start, new end, new length), sorted by line number
+	def collapsed_regions():
+		global LinesWithOverlap
+		previous_ChrID = None
+		previous_end_position = 0
+		for ChrID, start_position, num_line, end_position, value in sort_records( regions_in_list(), (str, int, int, int, str) ):
+			if ChrID != previous_ChrID: ## dealing with the first region of each chromosome
+				previous_ChrID = ChrID
+				previous_end_position = end_position
+				yield ( num_line, ChrID, start_position, end_position, end_position - start_position + 1 )
 			else:
-				fout.write(line.strip() + '\t' + ChrID + '\t' + "0" + '\t' + "0" + '\t' + "0" + '\n')
-		Lines = Lines + 1
-		if ( Lines % 10000 == 0):
-			sys.stdout.write("\r   processing %d+ lines" % (Lines))
-			sys.stdout.flush()
-	except (ValueError, IndexError):
-		if Lines == 1:
+				if start_position < previous_end_position:
+					LinesWithOverlap = LinesWithOverlap + 1
+				if start_position <= previous_end_position:
+					start_position = previous_end_position + 1
+				end_position = max(end_position, previous_end_position)
+				previous_end_position = end_position
+				if start_position < end_position:
+					yield ( num_line, ChrID, start_position, end_position, end_position - start_position + 1 )
+				else:
+					yield ( num_line, ChrID, 0, 0, 0 )
+
+	collapsed = sort_records( collapsed_regions(), (int, str, int, int, int) )
+
+	# (3) read <region_table.list> again and print each line with its collapsed columns
+	fin_list.close()
+	fin_list = open(args.region_table, "r")
+	next_collapsed = next(collapsed, None)
+	for line in fin_list:
+		if next_collapsed is not None and next_collapsed[0] == Lines:
+			fout.write( "%s\t%s\t%d\t%d\t%d\n" % ( (line.strip(),) + next_collapsed[1:] ) )
+			next_collapsed = next(collapsed, None)
+		elif Lines == 1:
 			print( "detected what looks like a header - editing to add new column headings," )
-			line = line[:-1] + "\tChrID\ts.collapsed\te.collapsed\tlen.collapsed\n"
+			fout.write( line[:-1] + "\tChrID\ts.collapsed\te.collapsed\tlen.collapsed\n" )
 		else:
 			print( "\nline %d non-processable, keeping without processing: %s" % (Lines, line) )
 			LinesWithError = LinesWithError + 1
-		fout.write(line)
+			fout.write(line)
+		Lines = Lines + 1
+		if ( Lines % 10000 == 0):
+			sys.stdout.write("\r   processing %d+ lines" % (Lines))
+			sys.stdout.flush()
+
+else:
+	# split only up to the end position column, convert once, and write many rows at a time
+	num_split = chromosome_column_index + 2
+	index_chr = chromosome_column_index - 1
+	index_start = chromosome_column_index
+	index_end = chromosome_column_index + 1
+	output_buffer = []
+	for line in fin_list:
+		try :
+			tok = line.split('\t', num_split)
+			ChrID = tok[index_chr].strip()
+			start_position = int( tok[index_start] ) # int() ignores surrounding spaces
+			end_position = int( tok[index_end] )
+			if ( (ChrID == previous_ChrID) and (start_position < previous_start_position) ):
+				print( "\n The input file appears not properly sorted at line number", str(Lines), "\n" )
+				print( "\n Use '-u' for unsorted input. Exiting, without further processing.\n" )
+				break
+	#		if ( end_position <= start_position ):
+			if ( end_position < start_position ): # don't raise error if e == s
+				raise ValueError()
+			if ( ChrID != previous_ChrID):  ## dealing with the first line of each chromosome
+				previous_start_position = start_position
+				previous_end_position = end_position
+				previous_ChrID = ChrID
+				output_buffer.append( "%s\t%s\t%d\t%d\t%d\n" % ( line.strip(), ChrID, start_position, end_position, end_position - start_position + 1 ) )
+			else:
+				if( start_position < previous_end_position):
+					LinesWithOverlap = LinesWithOverlap + 1
+				previous_start_position = start_position
+				if start_position <= previous_end_position: # 190603
+					start_position = previous_end_position + 1
+	#			start_position = max(start_position, previous_end_position)
+				if previous_end_position > end_position:
+					end_position = previous_end_position
+				previous_end_position = end_position
+				previous_ChrID = ChrID
+				if ( start_position < end_position): # 190603
+	#			if ( start_position != end_position):
+					output_buffer.append( "%s\t%s\t%d\t%d\t%d\n" % ( line.strip(), ChrID, start_position, end_position, end_position - start_position + 1 ) )
+				else:
+					output_buffer.append( "%s\t%s\t0\t0\t0\n" % ( line.strip(), ChrID ) )
+			Lines = Lines + 1
+			if ( Lines % 10000 == 0):
+				fout.write( ''.join(output_buffer) )
+				output_buffer = []
+				sys.stdout.write("\r   processing %d+ lines" % (Lines))
+				sys.stdout.flush()
+		except (ValueError, IndexError):
+			if Lines == 1:
+				print( "detected what looks like a header - editing to add new column headings," )
+				line = line[:-1] + "\tChrID\ts.collapsed\te.collapsed\tlen.collapsed\n"
+			else:
+				print( "\nline %d non-processable, keeping without processing: %s" % (Lines, line) )
+				LinesWithError = LinesWithError + 1
+			output_buffer.append(line)
+	fout.write( ''.join(output_buffer) )
 
 print( "\rOut of %d lines, %d overlapped with previous lines and %d excluded from processing due to unexpected column values" % (Lines, LinesWithOverlap, LinesWithError) )
 print( "writing to %s," % fout.name )
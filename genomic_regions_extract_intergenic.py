@@ -1,6 +1,10 @@
 #!/usr/bin/env python
 import sys, os, subprocess, argparse
 from argparse import RawTextHelpFormatter
+try: # optional; reader of binary TDfiles written by 'parse_gtf_2table.py -b'
+	import gtfParsed_binary
+except ImportError:
+	gtfParsed_binary = None
 
 ###################################################
 ### 0. script description and parsing arguments ###
@@ -17,6 +21,8 @@ synopsis2 = "detailed description:\n\
   - '-t Path2TDfiles': path to 'TDfiles'; 'CL_finder_multi.py -h' for details\n\
   - '-T TDfile_nameFmt': expects TDfiles (or '.gtfParsed.txt' files) named as\n\
      spcsID + TDfile_nameFmt ['.gtfParsed.txt'],\n\
+  - if an up-to-date binary sidecar '<TDfile>.bin' exists (see 'parse_gtf_2table.py\n\
+     -b'), it is read instead of the text TDfile,\n\
   - '-d': read only IUPAC nucleotide sequences from a ""dirty,"" fasta file,\n\
      i.e. sequence contains spaces, etc. [False].\n\
  2. Extracting and printing intergenic sequences:\n\
@@ -60,9 +66,10 @@ synopsis2 = "detailed description:\n\
  4. Misc:\n\
   - qIDs and tIDs in 'Pairs2compare' (or 'OGs2compare') should be formatted as \n\
      'spcsID|geneID'\n\
- by ohdongha@gmail.com ver0.3.1 20200928\n"
+ by ohdongha@gmail.com ver0.3.2 20261019\n"
  
 #version_history
+#20261019 ver 0.3.2 # read the binary sidecar (.gtfParsed.txt.bin) of TDfiles when present and up-to-date
 #20201114 script renamed to "genomic_regions_extract_intergenic.py"
 #20200928 ver 0.3.1 # activate the '-3' option perhaps by flipping the strand sign? ... hehehe (evil grin) 
 #20200614 ver 0.3 # modified to work with python 3.8
@@ -389,22 +396,34 @@ if not args.lastz_cmd_only:
 	
 		## 3.2 reading gene coordinates from the CLfm file
 		TDfileName = path_TDfiles + spcsID + args.TDfile_nameFmt
-		fin_TDfile = open( TDfileName, 'r')
-		print( "reading gene model coordinates from %s" % fin_TDfile.name )
-	
 		gene_coords_dict.clear() # initialize
 		n = 0
-		header = True
+		TDfileBin = None
+		if gtfParsed_binary is not None:
+			TDfileBin = gtfParsed_binary.sidecar_for( TDfileName )
 		
-		for line in fin_TDfile:
-			tok = line.strip().split('\t')
-			if header:
-				header = False
-			else:
+		if TDfileBin is not None: # v0.3.2 use the binary sidecar if up-to-date
+			print( "reading gene model coordinates from %s" % TDfileBin )
+			fin_TDbin = gtfParsed_binary.GtfParsedBin( TDfileBin )
+			for tok in fin_TDbin.rows():
 				n += 1
 				gene_coords_dict[n] = [ tok[i] for i in index_2use ]
-		print( "total %d gene model coordinates read from %s" % ( n, fin_TDfile.name) )
-		fin_TDfile.close()
+			fin_TDbin.close()
+			print( "total %d gene model coordinates read from %s" % ( n, TDfileBin) )
+		else:
+			fin_TDfile = open( TDfileName, 'r')
+			print( "reading gene model coordinates from %s" % fin_TDfile.name )
+			header = True
+			
+			for line in fin_TDfile:
+				tok = line.strip().split('\t')
+				if header:
+					header = False
+				else:
+					n += 1
+					gene_coords_dict[n] = [ tok[i] for i in index_2use ]
+			print( "total %d gene model coordinates read from %s" % ( n, fin_TDfile.name) )
+			fin_TDfile.close()
 		
 	
 		## 3.3 obtain coordinates to extract
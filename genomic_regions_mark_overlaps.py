@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-import sys, re, argparse
+import sys, io, re, gzip, bisect, heapq, collections, multiprocessing, argparse
 from argparse import RawTextHelpFormatter
 	
 ###################################################
@@ -28,10 +28,50 @@ synopsis2 = "detailed description:\n\
   - '-r'|'--reverse': look for regions in <query> INCLUDED within a region in\n\
      <target>; if the target region includes multiple <query> regions, print\n\
      the line in <target> multiple times with each uID; [False]\n\
-  - '-c'|'--counter': report progress per every X lines; [10000]\n\
-by ohdongha@gmail.com 20211115 ver 1.2.1\n\n"
+  - '-o'|'--overlap': look for regions in <query> overlapping a region in\n\
+     <target> by at least 1 bp, instead of including it; not with '-r'\n\
+  - '-f MIN_FRAC': with '-o', only overlaps covering at least MIN_FRAC of both\n\
+     the <query> and the <target> region (reciprocal); implies '-o'; [0]\n\
+  - '-b MIN_BP': only overlaps of at least MIN_BP nucleotides; implies '-o'\n\
+     unless '-r' is given; [0]\n\
+  - '-a'|'--aggregate': print each line in <target> once, followed by the\n\
+     number of matching <query> regions, the number of nucleotides in the\n\
+     <target> region covered by them (overlaps counted once), and their uIDs\n\
+     joined by ','; '0', '0', and '_na_' if none,\n\
+  - '-c'|'--counter': report progress per every X lines to STDERR; [10000]\n\
+  - <query>, <target>, and <output> can be gzip-compressed (.gz); <target> or\n\
+     <query> can be '-' to read from STDIN, and <output> can be '-' to write\n\
+     to STDOUT, in which case all messages are printed to STDERR,\n\
+ 3. Performance:\n\
+  - regions in <query> are indexed per chrID, sorted by start, with a tree of\n\
+     max/min end positions; each line in <target> is answered in O(log n + k)\n\
+     for n <query> regions on the chrID and k matches, instead of comparing\n\
+     with all <query> regions; uIDs are printed in the order of <query>.\n\
+  - '-s'|'--sorted': stream both files without indexing <query>, when lines\n\
+     of each chrID are consecutive and sorted by start in both <query> and\n\
+     <target> (e.g. 'sort -k2,2 -k3,3n <query>'); the order of chrIDs does not\n\
+     need to be the same; only <query> regions overlapping the current\n\
+     <target> region are kept in memory; stops with an error if either file\n\
+     appears not properly sorted.\n\
+  - '-n'|'--numpy': requires numpy; read <target> in chunks of ~1M lines and,\n\
+     per chrID, find with array operations (searchsorted on <query> starts and\n\
+     prefix max, or range min with '-r', of <query> ends) which regions have\n\
+     any match; only those are looked up in the index, and lines are printed\n\
+     per chunk; output is identical; fastest when most regions in <target>\n\
+     have no match; not with '-s'.\n\
+  - '-t'|'--threads': number of processes; with N > 1, regions in <target> are\n\
+     grouped by chrID and each chrID is marked in a separate process (sharing\n\
+     the <query> index by fork), then printed in the original order; keeps\n\
+     all of <target> and <output> in memory; not with '-s'; [1]\n\
+by ohdongha@gmail.com 20261019 ver 1.8\n\n"
 
 #version_history
+#20261019 ver 1.8 # gzip-compressed input and output, '-' for STDIN and STDOUT; progress printed to STDERR
+#20261019 ver 1.7 # '-t' option to mark regions per chrID in parallel processes
+#20261019 ver 1.6 # '-n' option to find <target> regions with any match in batches with numpy
+#20261019 ver 1.5 # added '-o', '-f', '-b' options for any/reciprocal/minimum-bp overlaps and '-a' to print one aggregated line per <target> region
+#20261019 ver 1.4 # '-s' option to mark regions with a sweep over sorted <query> and <target>
+#20261019 ver 1.3 # index <query> per chrID (sorted starts + max/min end tree) instead of looping over all regions for each <target> line
 #21211115 ver 1.2.1 modified to work with python 3
 #20210314 script renamed to "genomic_regions_mark_overlaps.py"
 #20201114 script renamed to "genomic_regions_mark_regions_included_in_others.py"
@@ -50,13 +90,257 @@ parser.add_argument('output', type=str, help="See below")
 # options
 parser.add_argument('-r', '--reverse', action="store_true", default=False)
 parser.add_argument('-c', '--counter', type=int, default=10000)
+parser.add_argument('-s', '--sorted', action="store_true", default=False)
+parser.add_argument('-o', '--overlap', action="store_true", default=False)
+parser.add_argument('-f', dest="min_frac", type=float, default=0)
+parser.add_argument('-b', dest="min_bp", type=int, default=0)
+parser.add_argument('-a', '--aggregate', action="store_true", default=False)
+parser.add_argument('-n', '--numpy', action="store_true", default=False)
+parser.add_argument('-t', '--threads', type=int, default=1)
 
 args = parser.parse_args()
+CHUNK_SIZE = 1000000 # lines in <target> per batch with '-n'
+if args.sorted and (args.numpy or args.threads > 1):
+	print( "'-s' cannot be used with '-n' or '-t', exiting..." )
+	sys.exit(1)
 
-fin_query = open(args.query, "r")
+# relation between <query> and <target> regions to look for
+if args.reverse:
+	relation = "included_in"
+	if args.overlap or args.min_frac > 0:
+		print( "'-o' and '-f' cannot be used with '-r', exiting..." )
+		sys.exit(1)
+elif args.overlap or args.min_frac > 0 or args.min_bp > 0:
+	relation = "overlapping"
+else:
+	relation = "including"
+
+#function to open a plain or gzip-compressed file in binary mode, or STDIN with '-'
+def open_input_binary(path):
+	if path == '-':
+		fin_raw = io.BufferedReader(sys.stdin.buffer)
+	else:
+		fin_raw = open(path, 'rb')
+	if fin_raw.peek(2)[:2] == b'\x1f\x8b': # gzip magic
+		fin_raw = gzip.GzipFile(fileobj=fin_raw, mode='rb')
+	return fin_raw
+
+#function to open an output file; gzip-compressed if the name ends with '.gz', STDOUT with '-'
+def open_output(path):
+	if path == '-':
+		return sys.stdout
+	elif path.endswith('.gz'):
+		return gzip.open(path, 'wt', compresslevel=6)
+	else:
+		return open(path, 'w')
+
+if args.sorted and args.query == '-':
+	print( "'-s' requires <query> to be a file, not STDIN, exiting..." )
+	sys.exit(1)
+if args.query == '-' and args.target == '-':
+	print( "only one of <query> and <target> can be STDIN, exiting..." )
+	sys.exit(1)
+fin_query = io.TextIOWrapper( open_input_binary(args.query) )
 chrID_colIndex = args.N
-fin_target = open(args.target, "r")
-fout = open(args.output, "w")
+fin_target = io.TextIOWrapper( open_input_binary(args.target) )
+fout = open_output(args.output)
+if args.output == '-': # keep STDOUT for <output>; messages go to STDERR
+	sys.stdout = sys.stderr
+
+#index of <query> regions in a chrID, sorted by start, with a segment tree of max and min end positions
+class RegionIndex(object):
+	def __init__(self, regions): # regions = list of (start, end, regionNum)
+		regions.sort()
+		self.starts = [ r[0] for r in regions ]
+		self.ends = [ r[1] for r in regions ]
+		self.regionNums = [ r[2] for r in regions ]
+		self.size = 1
+		while self.size < len(regions):
+			self.size *= 2
+		self.max_end = [ -1 ] * (2 * self.size)
+		self.min_end = [ float('inf') ] * (2 * self.size)
+		for k, end in enumerate(self.ends):
+			self.max_end[self.size + k] = end
+			self.min_end[self.size + k] = end
+		for k in range(self.size - 1, 0, -1):
+			self.max_end[k] = max( self.max_end[2*k], self.max_end[2*k + 1] )
+			self.min_end[k] = min( self.min_end[2*k], self.min_end[2*k + 1] )
+
+	# regionNums among sorted regions [lo, hi) with end >= min_end (or end <= max_end)
+	def collect(self, lo, hi, min_end=None, max_end=None):
+		found = []
+		if lo >= hi:
+			return found
+		stack = [ (1, 0, self.size) ]
+		while stack:
+			node, node_lo, node_hi = stack.pop()
+			if node_hi <= lo or node_lo >= hi:
+				continue
+			if min_end is not None and self.max_end[node] < min_end:
+				continue
+			if max_end is not None and self.min_end[node] > max_end:
+				continue
+			if node >= self.size:
+				found.append( self.regionNums[node - self.size] )
+			else:
+				node_mid = (node_lo + node_hi) // 2
+				stack.append( (2*node + 1, node_mid, node_hi) )
+				stack.append( (2*node, node_lo, node_mid) )
+		return found
+
+	# <query> regions including [start, end]
+	def including(self, start, end):
+		return self.collect( 0, bisect.bisect_right(self.starts, start), min_end = end )
+
+	# <query> regions included in [start, end]
+	def included_in(self, start, end):
+		return self.collect( bisect.bisect_left(self.starts, start), bisect.bisect_right(self.starts, end), max_end = end )
+
+	# <query> regions overlapping [start, end] by at least 1 bp
+	def overlapping(self, start, end):
+		return self.collect( 0, bisect.bisect_right(self.starts, end), min_end = start )
+
+#function to keep matches passing '-f' and '-b'; matches = list of (regionNum, uID, start, end)
+def filter_matches(matches, start_t, end_t):
+	if args.min_frac <= 0 and args.min_bp <= 0:
+		return matches
+	passed = []
+	for i, uID, start_q, end_q in matches:
+		overlap = min(end_q, end_t) - max(start_q, start_t) + 1
+		if overlap < args.min_bp:
+			continue
+		if overlap < args.min_frac * (end_q - start_q + 1) or overlap < args.min_frac * (end_t - start_t + 1):
+			continue
+		passed.append( (i, uID, start_q, end_q) )
+	return passed
+
+#function to count nucleotides in [start_t, end_t] covered by any of the matches
+def covered_bp(matches, start_t, end_t):
+	covered = 0
+	cur_s = cur_e = None
+	for start_q, end_q in sorted( (max(m[2], start_t), min(m[3], end_t)) for m in matches ):
+		if cur_e is not None and start_q <= cur_e + 1:
+			cur_e = max(cur_e, end_q)
+		else:
+			if cur_e is not None:
+				covered += cur_e - cur_s + 1
+			cur_s, cur_e = start_q, end_q
+	if cur_e is not None:
+		covered += cur_e - cur_s + 1
+	return covered
+
+#sweep over <query> regions sorted by start within each chrID, for <target> regions also sorted by start
+class SortedQuerySweep(object):
+	def __init__(self, path, relation):
+		self.fin = open_input_binary(path) # seekable; gzip-compressed <query> is decompressed again on seek
+		self.relation = relation
+		self.lines = 0
+		self.faulty = 0
+		self.offset_chr_dict = dict() # key = chrID, value = offset of its first line in <query>
+		self.chrID = None # current chrID of <target>
+		self.done_chr_set = set() # chrIDs of <target> already swept
+		self.last_start = 0 # last start in <target>, to check sorting
+		# first pass: check sorting of <query> and find where each chrID starts
+		offset = 0
+		prev_chrID = None
+		prev_start = 0
+		for line in self.fin:
+			self.lines += 1
+			region = self.parse(line)
+			if region is None:
+				self.faulty += 1
+			else:
+				if region[0] != prev_chrID:
+					if region[0] in self.offset_chr_dict:
+						self.exit_unsorted( "<query>", self.lines )
+					self.offset_chr_dict[ region[0] ] = offset
+					prev_chrID = region[0]
+				elif region[1] < prev_start:
+					self.exit_unsorted( "<query>", self.lines )
+				prev_start = region[1]
+			offset += len(line)
+
+	def exit_unsorted(self, name, num_line):
+		print( "\n%s appears not properly sorted at line %d; sort by chrID and start, or run without '-s', exiting..." % (name, num_line) )
+		sys.exit(1)
+
+	# (chrID, start, end, uID) from a line of <query>, or None if invalid
+	def parse(self, line):
+		tok = line.decode().split('\t')
+		try:
+			start_q = int(tok[2].strip())
+			end_q = int(tok[3].strip())
+		except (IndexError, ValueError) :
+			return None
+		if end_q < start_q:
+			return None
+		return ( tok[1].strip(), start_q, end_q, tok[0].strip() )
+
+	# next valid <query> region on the current chrID, or None
+	def read_next(self):
+		while self.in_chr:
+			line = self.fin.readline()
+			if line == b'':
+				break
+			region = self.parse(line)
+			if region is not None:
+				if region[0] != self.chrID:
+					break
+				self.num_region += 1
+				return ( region[1], region[2], self.num_region, region[3] )
+		self.in_chr = False
+		return None
+
+	# switch to a new chrID in <target>
+	def start_chr(self, chrID):
+		self.chrID = chrID
+		self.last_start = 0
+		self.active = [] # heap of (end, regionNum, uID, start); deque of (start, end, regionNum, uID) with '-r'
+		if self.relation == "included_in":
+			self.active = collections.deque()
+		self.num_region = 0
+		self.in_chr = chrID in self.offset_chr_dict
+		if self.in_chr:
+			self.fin.seek( self.offset_chr_dict[chrID] )
+		self.pending = self.read_next()
+
+	# list of (regionNum, uID, start, end) of <query> regions in the relation with [start_t, end_t]
+	def find(self, chrID, start_t, end_t, num_line):
+		if chrID != self.chrID:
+			if chrID in self.done_chr_set:
+				self.exit_unsorted( "<target>", num_line )
+			self.done_chr_set.add(chrID)
+			self.start_chr(chrID)
+		elif start_t < self.last_start:
+			self.exit_unsorted( "<target>", num_line )
+		self.last_start = start_t
+		found = []
+		if self.relation == "included_in":
+			while self.active and self.active[0][0] < start_t:
+				self.active.popleft()
+			while self.pending is not None and self.pending[0] <= end_t:
+				if self.pending[0] >= start_t:
+					self.active.append(self.pending)
+				self.pending = self.read_next()
+			for start_q, end_q, i, uID in self.active:
+				if start_q > end_t:
+					break
+				if end_q <= end_t:
+					found.append( (i, uID, start_q, end_q) )
+		else:
+			if self.relation == "including":
+				load_until = start_t
+			else:
+				load_until = end_t
+			while self.pending is not None and self.pending[0] <= load_until:
+				heapq.heappush( self.active, (self.pending[1], self.pending[2], self.pending[3], self.pending[0]) )
+				self.pending = self.read_next()
+			while self.active and self.active[0][0] < start_t:
+				heapq.heappop(self.active)
+			for end_q, i, uID, start_q in self.active:
+				if ( self.relation == "including" and end_q >= end_t ) or ( self.relation == "overlapping" and start_q <= end_t ):
+					found.append( (i, uID, start_q, end_q) )
+		return sorted(found)
 
 
 ##########################################################
@@ -76,29 +360,95 @@ chrID_dict = dict()
 start_dict = dict()
 end_dict = dict()
 
-for line in fin_query:
-	tok = re.split('\t', line)
-#	tok = line.split('\t')
-	lines_in_region_table = lines_in_region_table + 1
-	try:
-		uID = tok[0].strip()
-		chrID = tok[1].strip()	
-		start_q = int(tok[2].strip())
-		end_q = int(tok[3].strip())
-		if end_q >= start_q :
-			uID_dict[regionNum] = uID
-			chrID_dict[regionNum] = chrID
-			start_dict[regionNum] = start_q
-			end_dict[regionNum] = end_q
-			regionNum = regionNum + 1
-		else:
-			faultyLines_in_region_table = faultyLines_in_region_table +1			
-	except (IndexError, ValueError) :
-		faultyLines_in_region_table = faultyLines_in_region_table +1
+if args.sorted:
+	sweep = SortedQuerySweep(args.query, relation)
+	lines_in_region_table = sweep.lines
+	faultyLines_in_region_table = sweep.faulty
+else:
+	for line in fin_query:
+		tok = re.split('\t', line)
+	#	tok = line.split('\t')
+		lines_in_region_table = lines_in_region_table + 1
+		try:
+			uID = tok[0].strip()
+			chrID = tok[1].strip()	
+			start_q = int(tok[2].strip())
+			end_q = int(tok[3].strip())
+			if end_q >= start_q :
+				uID_dict[regionNum] = uID
+				chrID_dict[regionNum] = chrID
+				start_dict[regionNum] = start_q
+				end_dict[regionNum] = end_q
+				regionNum = regionNum + 1
+			else:
+				faultyLines_in_region_table = faultyLines_in_region_table +1			
+		except (IndexError, ValueError) :
+			faultyLines_in_region_table = faultyLines_in_region_table +1
+
+	regions_chr_dict = dict() # key = chrID, value = list of (start, end, regionNum)
+	for i in range(0, regionNum):
+		regions_chr_dict.setdefault( chrID_dict[i], [] ).append( (start_dict[i], end_dict[i], i) )
+	index_chr_dict = dict() # key = chrID, value = RegionIndex
+	for chrID in regions_chr_dict:
+		index_chr_dict[chrID] = RegionIndex( regions_chr_dict[chrID] )
+	regions_chr_dict.clear()
+
+	# with '-n', arrays of <query> regions per chrID, for batches of <target> lines
+	if args.numpy:
+		try:
+			import numpy as np
+		except ImportError:
+			print( "'-n' requires numpy; install it or run without '-n', exiting..." )
+			sys.exit(1)
+		arrays_chr_dict = dict() # key = chrID, value = [starts, prefix max of ends, sparse table of min of ends]
+		for chrID in index_chr_dict:
+			starts = np.array( index_chr_dict[chrID].starts, dtype=np.int64 )
+			ends = np.array( index_chr_dict[chrID].ends, dtype=np.int64 )
+			min_table = [ends] # min_table[j][k] = min( ends[k : k + 2**j] ), for '-r'
+			if relation == "included_in":
+				while 2 ** len(min_table) <= len(ends):
+					prev = min_table[-1]
+					half = 2 ** (len(min_table) - 1)
+					min_table.append( np.minimum( prev[:-half], prev[half:] ) )
+			arrays_chr_dict[chrID] = [ starts, np.maximum.accumulate(ends), min_table ]
+
+#function to find regions in a chunk of <target> with any matching <query> region, using sorted start
+# positions and prefix max (or range min with '-r') of end positions of <query> per chrID; returns a bool array
+def find_hits_numpy(chrIDs, start_t, end_t):
+	hits = np.zeros( len(chrIDs), dtype=bool )
+	chrID_names, chrID_codes, chrID_counts = np.unique( np.array(chrIDs), return_inverse=True, return_counts=True )
+	order = np.argsort( chrID_codes, kind='stable' ) # group the chunk by chrID once
+	bounds = np.concatenate( ( [0], np.cumsum(chrID_counts) ) ).tolist()
+	for c, chrID in enumerate( chrID_names.tolist() ):
+		if chrID not in arrays_chr_dict:
+			continue
+		sel = order[ bounds[c] : bounds[c + 1] ]
+		starts, max_ends, min_table = arrays_chr_dict[chrID]
+		s_t = start_t[sel]
+		e_t = end_t[sel]
+		if relation == "included_in": # any <query> with start in [start_t, end_t] and end <= end_t
+			lo = np.searchsorted(starts, s_t, side='left')
+			hi = np.searchsorted(starts, e_t, side='right')
+			nonempty = np.nonzero(hi > lo)[0]
+			levels = np.floor( np.log2( hi[nonempty] - lo[nonempty] ) ).astype(np.int64)
+			for level in np.unique(levels).tolist():
+				k = nonempty[levels == level]
+				table = min_table[level]
+				hits[ sel[k] ] = np.minimum( table[ lo[k] ], table[ hi[k] - 2 ** level ] ) <= e_t[k]
+		else: # any <query> with start <= start_t ('including') or <= end_t ('overlapping'), and a large enough end
+			if relation == "including":
+				p = np.searchsorted(starts, s_t, side='right')
+				min_end = e_t
+			else:
+				p = np.searchsorted(starts, e_t, side='right')
+				min_end = s_t
+			k = np.nonzero(p > 0)[0]
+			hits[ sel[k] ] = max_ends[ p[k] - 1 ] >= min_end[k]
+	return hits
 
-print( "Reading <query> file: %s \n" % fin_query.name )
+print( "Reading <query> file: %s \n" % args.query )
 print( "Out of total %d line in query, %d were rejected.\n" % (lines_in_region_table, faultyLines_in_region_table) )
-print( "Now marking regions in <target> file: %s \n" % fin_target.name )
+print( "Now marking regions in <target> file: %s \n" % args.target )
 fin_query.close()
 
 
@@ -108,39 +458,135 @@ collectedLines = 0
 chrID = ""
 start_t = 0
 end_t = 0
-counted = 0
 
-for line in fin_target:
-	try :
-		tok = re.split('\t', line)
-		chrID = tok[chrID_colIndex - 1].strip()
-		start_t = int( tok[chrID_colIndex].strip() )
-		end_t = int( tok[chrID_colIndex + 1].strip() )
-		if args.reverse:
-			for i in range(0, regionNum) :
-				if  (chrID_dict[i] == chrID) and (start_dict[i] >= start_t) and (end_dict[i] <= end_t) : 
-					fout.write(line.strip() + '\t' + uID_dict[i] + '\n')
-					counted = 1		
+#function to mark a region in <target>; returns lines to print and whether any <query> region matched
+def mark_region(line, chrID, start_t, end_t):
+	found = []
+	if args.sorted:
+		found = sweep.find(chrID, start_t, end_t, Lines + 1)
+	elif chrID in index_chr_dict:
+		found = [ (i, uID_dict[i], start_dict[i], end_dict[i]) for i in \
+			sorted( getattr(index_chr_dict[chrID], relation)(start_t, end_t) ) ]
+	found = filter_matches(found, start_t, end_t)
+	if not found:
+		return line.strip() + na_suffix, False # if not included in (or including) any region in <query>
+	if args.aggregate:
+		return line.strip() + '\t%d\t%d\t' % ( len(found), covered_bp(found, start_t, end_t) ) + ','.join( m[1] for m in found ) + '\n', True
+	return ''.join( line.strip() + '\t' + uID + '\n' for i, uID, start_q, end_q in found ), True # in the order of <query>
+
+if args.aggregate:
+	na_suffix = '\t0\t0\t_na_\n'
+else:
+	na_suffix = '\t_na_\n'
+
+if args.threads > 1:
+	# group <target> regions per chrID, mark each chrID in a process pool, and print in the original order
+	targets_chr_dict = dict() # key = chrID, value = [line numbers, lines, starts, ends]
+	for line in fin_target:
+		tok = line.split('\t', chrID_colIndex + 2)
+		try :
+			start_t = int( tok[chrID_colIndex] )
+			end_t = int( tok[chrID_colIndex + 1] )
+		except (ValueError, IndexError):
+			continue
+		targets = targets_chr_dict.setdefault( tok[chrID_colIndex - 1].strip(), [ [], [], [], [] ] )
+		targets[0].append(Lines)
+		targets[1].append(line)
+		targets[2].append(start_t)
+		targets[3].append(end_t)
+		Lines = Lines + 1
+	
+	#function to mark all <target> regions on a chrID; runs in a worker process forked with the <query> index
+	def mark_chr(chrID):
+		nums, lines, starts, ends = targets_chr_dict[chrID]
+		if args.numpy:
+			hits = find_hits_numpy( [chrID] * len(lines), np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64) ).tolist()
 		else:
-			for i in range(0, regionNum) :
-				if  (chrID_dict[i] == chrID) and (start_dict[i] <= start_t) and (end_dict[i] >= end_t) : 
-					fout.write(line.strip() + '\t' + uID_dict[i] + '\n')
-					counted = 1
-		if (counted == 1):
+			hits = [True] * len(lines)
+		output = []
+		num_counted = 0
+		for k in range(len(lines)):
+			if hits[k]:
+				marked, counted = mark_region( lines[k], chrID, starts[k], ends[k] )
+				output.append(marked)
+				num_counted += counted
+			else:
+				output.append( lines[k].strip() + na_suffix )
+		return chrID, output, num_counted
+	
+	output_lines = [None] * Lines
+	pool = multiprocessing.get_context('fork').Pool(args.threads)
+	# largest chrIDs first, to keep all processes busy until the end
+	for chrID, output, num_counted in pool.imap_unordered( mark_chr, sorted( targets_chr_dict, key = lambda c: -len(targets_chr_dict[c][0]) ) ):
+		for num, marked in zip(targets_chr_dict[chrID][0], output):
+			output_lines[num] = marked
+		collectedLines += num_counted
+		sys.stderr.write("\r   marked %d regions; done with chrID %s " % (collectedLines, chrID))
+		sys.stderr.flush()
+	pool.close()
+	pool.join()
+	for k in range(0, Lines, CHUNK_SIZE):
+		fout.write( ''.join( output_lines[k : k + CHUNK_SIZE] ) )
+elif args.numpy:
+	# read <target> in chunks; regions without any match are printed without looking up the index
+	while True:
+		chunk = fin_target.readlines(CHUNK_SIZE * 50) # ~ CHUNK_SIZE lines
+		if not chunk:
+			break
+		lines = []
+		chrIDs = []
+		starts = []
+		ends = []
+		for line in chunk:
+			tok = line.split('\t', chrID_colIndex + 2)
+			try :
+				start_t = int( tok[chrID_colIndex] ) # int() ignores surrounding spaces
+				end_t = int( tok[chrID_colIndex + 1] )
+			except (ValueError, IndexError):
+				continue
+			lines.append(line)
+			chrIDs.append( tok[chrID_colIndex - 1].strip() )
+			starts.append(start_t)
+			ends.append(end_t)
+		if not lines:
+			continue
+		hits = find_hits_numpy( chrIDs, np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64) ).tolist()
+		output = []
+		for k in range(len(lines)):
+			if hits[k]:
+				marked, counted = mark_region( lines[k], chrIDs[k], starts[k], ends[k] )
+				output.append(marked)
+				collectedLines += counted
+			else:
+				output.append( lines[k].strip() + na_suffix )
+		fout.write( ''.join(output) )
+		Lines += len(lines)
+		sys.stderr.write("\r   marked %d regions out of %d" % (collectedLines, Lines))
+		sys.stderr.flush()
+else:
+	for line in fin_target:
+		try :
+			tok = re.split('\t', line)
+			chrID = tok[chrID_colIndex - 1].strip()
+			start_t = int( tok[chrID_colIndex].strip() )
+			end_t = int( tok[chrID_colIndex + 1].strip() )
+		except (ValueError, IndexError):
+			continue
+		marked, counted = mark_region(line, chrID, start_t, end_t)
+		fout.write(marked)
+		if counted:
 			collectedLines = collectedLines + 1
-			counted = 0
-		else:
-			fout.write(line.strip() + '\t_na_\n') # if not included in (or including) any region in <query>
 		Lines = Lines + 1
 		if ( Lines % args.counter == 0):
-			sys.stdout.write("\r   marked %d regions out of %d" % (collectedLines, Lines))
-			sys.stdout.flush()
-	except (ValueError, IndexError):
-		pass
+			sys.stderr.write("\r   marked %d regions out of %d" % (collectedLines, Lines))
+			sys.stderr.flush()
 
-print( "\n\nFor total ", Lines, " regions in ", sys.argv[3].strip(), ", ", collectedLines, " were marked." )
-print( "Printing to ", sys.argv[4].strip(), ": \n" )
+print( "\n\nFor total ", Lines, " regions in ", args.target, ", ", collectedLines, " were marked." )
+print( "Printing to ", args.output, ": \n" )
 fin_target.close()
-fout.close()
+if args.output != '-':
+	fout.close()
+else:
+	fout.flush()
 
 print( "done" )
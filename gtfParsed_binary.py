@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+import sys, os, mmap, struct, argparse
+from argparse import RawTextHelpFormatter
+
+###################################################
+### 0. script description and parsing arguments ###
+###################################################
+synopsis1 = "\
+  writes and reads the binary, columnar sidecar (.gtfParsed.txt.bin) of a\n\
+  .gtfParsed.txt table created by 'parse_gtf_2table.py'"
+synopsis2 = "detailed description:\n\
+ 1. Format of <.gtfParsed.txt.bin>:\n\
+  - all numbers are little-endian; each column is 8-byte aligned and can be\n\
+     memory-mapped and accessed without copying,\n\
+  - header: magic 'GTFPBIN2', #rows, #chromosomes, size and mtime of the\n\
+     .gtfParsed.txt the sidecar was created from, and offsets of each column,\n\
+  - string tables: geneID and chromosome IDs, stored as uint64 offsets into a\n\
+     utf-8 blob; each row refers to its chromosome by a uint32 index,\n\
+  - Str: one byte per row ('+', '-', or '.'),\n\
+  - mRNA_s, mRNA_e, #exon_mRNA, mRNA_l, CDS_s, CDS_e, #exon_CDS, CDS_l: int64\n\
+     per row; 'NA' in the .gtfParsed.txt is stored as -1,\n\
+  - extra: any columns after CDS_l (e.g. cID with 'parse_gtf_2table.py -l'),\n\
+     as a string table; entry 0 is for the header line and entry i + 1 for\n\
+     row i, each with a tab before every column, so that the .gtfParsed.txt\n\
+     can be written back exactly; lines with fewer than 11 columns are skipped.\n\
+ 2. Use as a script:\n\
+  - 'gtfParsed_binary.py <input.gtfParsed.txt>' writes <input.gtfParsed.txt>.bin;\n\
+     'parse_gtf_2table.py -b' does the same right after creating the table,\n\
+  - '-d': instead, print the header and rows of an existing .bin to STDOUT as\n\
+     text, same as the .gtfParsed.txt.\n\
+ 3. Use as a module (e.g. in genomic_regions_extract_intergenic.py):\n\
+  - 'GtfParsedBin(path)' maps the file in O(1); 'column(name)' returns a\n\
+     zero-copy memoryview of a numeric column, 'geneID(i)', 'chr(i)' and\n\
+     'strand(i)' return values of row i, 'header()' returns the column names,\n\
+     and 'rows()' yields rows as lists of strings, same as '.split('\\t')'\n\
+     of the .gtfParsed.txt lines,\n\
+  - 'sidecar_for(path_txt)' returns the path of an up-to-date .bin for\n\
+     path_txt, or None if the .bin is missing or out-of-date.\n\
+by ohdongha@gmail.com 20261019 ver 0.2\n\n"
+
+#version_history
+#20261019 ver 0.2 # columns after CDS_l (e.g. cID) stored as a string table, so that the .gtfParsed.txt can be written back exactly; magic 'GTFPBIN2'
+#20261019 ver 0.1 # binary, memory-mappable sidecar of .gtfParsed.txt
+
+MAGIC = b'GTFPBIN2'
+HEADER_FMT = '<8sIIQq16Q' # magic, n_rows, n_chr, txt_size, txt_mtime_ns, 16 section offsets
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+TEXT_COLUMNS = ["geneID", "Chr", "Str", "mRNA_s", "mRNA_e", "#exon_mRNA", "mRNA_l", "CDS_s", "CDS_e", "#exon_CDS", "CDS_l"]
+INT_COLUMNS = ["mRNA_s", "mRNA_e", "#exon_mRNA", "mRNA_l", "CDS_s", "CDS_e", "#exon_CDS", "CDS_l"]
+# order of sections in the file; their offsets are stored in the header in the same order
+SECTIONS = ["geneID_offsets", "geneID_blob", "chr_offsets", "chr_blob", "chr_index", "Str"] + INT_COLUMNS + ["extra_offsets", "extra_blob"]
+
+
+#function to pad a section to 8 bytes
+def _pad(data):
+	return data + b'\0' * ( -len(data) % 8 )
+
+#function to pack a list of strings as uint64 offsets and a utf-8 blob
+def _pack_strings(strings):
+	encoded = [ s.encode() for s in strings ]
+	offsets = [0]
+	for e in encoded:
+		offsets.append( offsets[-1] + len(e) )
+	return struct.pack( '<%dQ' % len(offsets), *offsets ), b''.join(encoded)
+
+#function to write the .bin sidecar of a .gtfParsed.txt file; returns the number of rows
+def write_sidecar(path_txt, path_bin=None):
+	if path_bin is None:
+		path_bin = path_txt + ".bin"
+	geneIDs = []
+	chr_index = []
+	chr_dict = dict() # key = chrID, value = index
+	strands = []
+	values = [ [] for c in INT_COLUMNS ]
+	extras = [""] # columns after CDS_l, with a tab before each; the first for the header
+	with open(path_txt, 'r') as fin:
+		for line in fin:
+			tok = line.rstrip('\n').split('\t')
+			if len(tok) < 11:
+				continue
+			if tok[0] == "geneID": # header
+				extras[0] = ''.join( '\t' + t for t in tok[11:] )
+				continue
+			geneIDs.append( tok[0] )
+			if tok[1] not in chr_dict:
+				chr_dict[ tok[1] ] = len(chr_dict)
+			chr_index.append( chr_dict[ tok[1] ] )
+			strands.append( tok[2][:1] or '.' )
+			for c in range(len(INT_COLUMNS)):
+				values[c].append( -1 if tok[3 + c] == "NA" else int(tok[3 + c]) )
+			extras.append( ''.join( '\t' + t for t in tok[11:] ) )
+	n_rows = len(geneIDs)
+	chrIDs = sorted( chr_dict, key=chr_dict.get )
+	geneID_offsets, geneID_blob = _pack_strings(geneIDs)
+	chr_offsets, chr_blob = _pack_strings(chrIDs)
+	extra_offsets, extra_blob = _pack_strings(extras)
+	sections = [ geneID_offsets, geneID_blob, chr_offsets, chr_blob, \
+		struct.pack( '<%dI' % n_rows, *chr_index ), ''.join(strands).encode() ] + \
+		[ struct.pack( '<%dq' % n_rows, *v ) for v in values ] + [ extra_offsets, extra_blob ]
+
+	stat = os.stat(path_txt)
+	offsets = []
+	offset = HEADER_SIZE
+	for section in sections:
+		offsets.append(offset)
+		offset += len( _pad(section) )
+	with open(path_bin, 'wb') as fout:
+		fout.write( struct.pack(HEADER_FMT, MAGIC, n_rows, len(chrIDs), stat.st_size, stat.st_mtime_ns, *offsets) )
+		for section in sections:
+			fout.write( _pad(section) )
+	return n_rows
+
+#function to find an up-to-date .bin sidecar of a .gtfParsed.txt file
+def sidecar_for(path_txt):
+	path_bin = path_txt + ".bin"
+	if not os.path.isfile(path_bin):
+		return None
+	try:
+		with open(path_bin, 'rb') as fin:
+			header = struct.unpack( HEADER_FMT, fin.read(HEADER_SIZE) )
+	except struct.error:
+		return None
+	if header[0] != MAGIC:
+		return None
+	if os.path.isfile(path_txt):
+		stat = os.stat(path_txt)
+		if (stat.st_size, stat.st_mtime_ns) != (header[3], header[4]):
+			return None
+	return path_bin
+
+
+################################################
+### 1. reader of the .gtfParsed.txt.bin file ###
+################################################
+class GtfParsedBin(object):
+	def __init__(self, path_bin):
+		self.name = path_bin
+		self.handle = open(path_bin, 'rb')
+		self.map = mmap.mmap( self.handle.fileno(), 0, access=mmap.ACCESS_READ )
+		self.view = memoryview(self.map)
+		self.views = [] # all views into the map; released on close()
+		header = struct.unpack_from( HEADER_FMT, self.map, 0 )
+		if header[0] != MAGIC:
+			raise ValueError( "%s is not a .gtfParsed.txt.bin file (or was written by an older version)" % path_bin )
+		self.n_rows = header[1]
+		self.n_chr = header[2]
+		self.offsets = dict( zip(SECTIONS, header[5:]) )
+		self.geneID_offsets = self._section( "geneID_offsets", 'Q', self.n_rows + 1 )
+		self.geneID_blob = self._section( "geneID_blob", 'B', self.offsets["chr_offsets"] - self.offsets["geneID_blob"] )
+		chr_offsets = self._section( "chr_offsets", 'Q', self.n_chr + 1 )
+		chr_blob = self._section( "chr_blob", 'B', self.offsets["chr_index"] - self.offsets["chr_blob"] )
+		self.chrIDs = [ bytes( chr_blob[ chr_offsets[i] : chr_offsets[i+1] ] ).decode() for i in range(self.n_chr) ] # small; decode once
+		self.chr_index = self._section( "chr_index", 'I', self.n_rows )
+		self.strands = self._section( "Str", 'B', self.n_rows )
+		self.extra_offsets = self._section( "extra_offsets", 'Q', self.n_rows + 2 )
+		self.extra_blob = self._section( "extra_blob", 'B', self.extra_offsets[self.n_rows + 1] )
+
+	def _section(self, name, fmt, n):
+		start = self.offsets[name]
+		section = self.view[ start : start + struct.calcsize(fmt) * n ].cast(fmt)
+		self.views.append(section)
+		return section
+
+	def __len__(self):
+		return self.n_rows
+
+	# zero-copy access to a numeric column, e.g. column("CDS_s")[i]; 'NA' is -1
+	def column(self, name):
+		return self._section( name, 'q', self.n_rows )
+
+	def geneID(self, i):
+		return bytes( self.geneID_blob[ self.geneID_offsets[i] : self.geneID_offsets[i+1] ] ).decode()
+
+	def chr(self, i):
+		return self.chrIDs[ self.chr_index[i] ]
+
+	def strand(self, i):
+		return chr( self.strands[i] )
+
+	# columns after CDS_l of row i (or of the header if i is -1), with a tab before each
+	def extra(self, i):
+		return bytes( self.extra_blob[ self.extra_offsets[i+1] : self.extra_offsets[i+2] ] ).decode()
+
+	# column names, same as the header line of .gtfParsed.txt
+	def header(self):
+		return TEXT_COLUMNS + self.extra(-1).split('\t')[1:]
+
+	# rows as lists of strings, same as the tab-separated records of .gtfParsed.txt
+	def rows(self):
+		columns = [ self.column(name) for name in INT_COLUMNS ]
+		for i in range(self.n_rows):
+			row = [ self.geneID(i), self.chr(i), self.strand(i) ] + \
+				[ "NA" if c[i] == -1 else str(c[i]) for c in columns ]
+			if self.extra_offsets[i+2] > self.extra_offsets[i+1]:
+				row += self.extra(i).split('\t')[1:]
+			yield row
+
+	def close(self):
+		for section in self.views:
+			section.release()
+		self.view.release()
+		self.map.close()
+		self.handle.close()
+
+
+####################################
+### 2. when executed as a script ###
+####################################
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = synopsis1, epilog = synopsis2, formatter_class = RawTextHelpFormatter)
+	parser.add_argument('input', type=str, help=".gtfParsed.txt (or .gtfParsed.txt.bin with '-d')")
+	parser.add_argument('-d', '--dump', action="store_true", default=False)
+	args = parser.parse_args()
+
+	if args.dump:
+		gtfParsed = GtfParsedBin(args.input)
+		sys.stdout.write( '\t'.join( gtfParsed.header() ) + '\n' )
+		for row in gtfParsed.rows():
+			sys.stdout.write( '\t'.join(row) + '\n' )
+		gtfParsed.close()
+	else:
+		n = write_sidecar(args.input)
+		print( "wrote %d rows of %s to %s" % ( n, args.input, args.input + ".bin" ) )
@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-import sys, os, math, subprocess, datetime, argparse
+import sys, os, io, math, zlib, struct, gzip, hashlib, heapq, subprocess, datetime, argparse
 from argparse import RawTextHelpFormatter
 
 
@@ -19,13 +19,20 @@ synopsis2 = "detailed description:\n\
   - <output.txt> is sorted based on mRNA_start and then Chr, alphanumerically.\n\
      for the same mRNA_s, entries with longer CDS_l and mRNA_l come first.\n\
   - '-g'|'--gene_id': use 'gene_id' record instead of 'transcript_id'\n\
+  - <input.gtf> can be gzip- or bgzip-compressed, or '-' to read from STDIN.\n\
  2. Options for multiple gene models in a locus (ex. isoforms):\n\
   - '-c'|'--collapse': remove gene loci whose coordinates identical with or\n\
      nested in another gene locus. report collapese loci to STDOUT.\n\
   - '-m MARGIN': gene loci coordinates different by less than MARGIN nucleotides\n\
      are considered identical. assume '-c' automatically.\n\
   - '-r'|'--report': report transcript_id overlapping with others\n\
-     (e.g. isoforms) to STDOUT.\n\
+     (e.g. isoforms) to STDOUT; every overlapping pair on the same Chr and Str\n\
+     is reported, one line per pair, not only overlaps with the previous line.\n\
+  - '-C'|'--CDS_overlap': with '-r', use CDS_s and CDS_e instead of mRNA_s and\n\
+     mRNA_e; transcripts without CDS records are ignored.\n\
+  - '-k MAX_OVERLAPS': with '-r', report at most MAX_OVERLAPS pairs for each\n\
+     transcript, those with the largest overlaps first, then with the nearest\n\
+     start positions and by transcript_id; [0] (no limit)\n\
   - '-l'|'--cluster': instead of collapsing overlapping transcript models\n\
      cluster them and report numerical cluster IDs as the last column; all\n\
      transcript models who overlap and in the same direction\strain, are\n\
@@ -39,10 +46,31 @@ synopsis2 = "detailed description:\n\
      CDS records);\n\
   - '-e <transcriptID.list>': given a list of transcriptIDs, one per line,\n\
      print .gtf file containing only those in <transcriptID.list>; <output.txt>\n\
-     is the filtered .gtf file, instead of a .gtfParsed.txt file.\n\
-by ohdongha@gmail.com 20201129 ver 0.6.1\n\n"
+     is the filtered .gtf file, instead of a .gtfParsed.txt file; <output.txt>\n\
+     can be '-' to write to STDOUT (messages go to STDERR), or end with '.gz'\n\
+     to write a BGZF (bgzip) compressed file.\n\
+  - '-I'|'--index': before anything else, build a transcript index\n\
+     <input.gtf>.tidx with byte ranges of each transcript_id (or gene_id with\n\
+     '-g'); with '-e', an up-to-date .tidx is used to read only the requested\n\
+     transcripts instead of scanning <input.gtf>; requires an uncompressed\n\
+     <input.gtf> file.\n\
+ 4. Options for faster re-runs and downstream scripts:\n\
+  - '-b'|'--binary': also write <output.txt>.bin, a binary, memory-mappable\n\
+     copy of <output.txt>; see 'gtfParsed_binary.py -h'.\n\
+  - '-U'|'--incremental': keep per-chromosome hashes and rows in\n\
+     <output.txt>.chrcache; in later runs with '-U', only chromosomes whose\n\
+     .gtf lines changed are parsed again and the rest are copied from the\n\
+     cache; with an uncompressed <input.gtf>, only the lines of the changed\n\
+     chromosomes are read again; <input.gtf> should be a file, not STDIN.\n\
+by ohdongha@gmail.com 20261019 ver 0.6.7\n\n"
 
 #version_history
+#20261019 ver 0.6.7 # with -k, report the pairs with the largest overlaps, instead of the first ones in the heap
+#20261019 ver 0.6.6 # -r reports all overlapping pairs using a sweep with a heap of active transcripts, not only overlaps with the previous line; added -C and -k options
+#20261019 ver 0.6.5 # added -U option to re-parse only chromosomes whose .gtf lines changed, using per-chromosome hashes and rows cached in <output.txt>.chrcache
+#20261019 ver 0.6.4 # added -b option to write a binary, memory-mappable sidecar (.gtfParsed.txt.bin) of <output.txt>
+#20261019 ver 0.6.3 # added -I option to build a transcript index (.tidx) of byte ranges; -e uses it to seek directly to requested transcripts
+#20261019 ver 0.6.2 # <input.gtf> can be gzip/bgzip-compressed or '-' (STDIN); with -e, write BGZF-compressed output if <output.txt> ends with '.gz'
 #20201129 ver 0.6 # when sorting on Chr, use "sort -k2,2V" instead of "sort -k2,2" per https://stackoverflow.com/a/34054179/6283377
 #20200612 ver 0.6 # let's try to make it run on python 3.8... 
 #20191225 ver 0.5.3 # -e option report transcriptID that were not found in <input.gtf> 
@@ -81,8 +109,8 @@ by ohdongha@gmail.com 20201129 ver 0.6.1\n\n"
 parser = argparse.ArgumentParser(description = synopsis1, epilog = synopsis2, formatter_class = RawTextHelpFormatter)
 
 # positional parameters
-parser.add_argument('input_gtf', type=argparse.FileType('r'))
-parser.add_argument('outfile', type=argparse.FileType('w'))
+parser.add_argument('input_gtf', type=str)
+parser.add_argument('outfile', type=str)
 
 # options
 parser.add_argument('-g', '--gene_id', action="store_true", default=False)
@@ -93,9 +121,130 @@ parser.add_argument('-l', '--cluster', action="store_true", default=False)
 parser.add_argument('-L', '--Longest_ORF', action="store_true", default=False)
 parser.add_argument('-p', '--protein_coding', action="store_true", default=False)
 parser.add_argument('-e', dest="tID_list", type=str, default= "")
+parser.add_argument('-I', '--index', action="store_true", default=False)
+parser.add_argument('-b', '--binary', action="store_true", default=False)
+parser.add_argument('-U', '--incremental', action="store_true", default=False)
+parser.add_argument('-C', '--CDS_overlap', action="store_true", default=False)
+parser.add_argument('-k', dest="max_overlaps", type=int, default= 0)
 
 args = parser.parse_args()
-outfile_name = args.outfile.name
+outfile_name = args.outfile
+input_gtf_name = args.input_gtf
+
+
+#function to open a plain or gzip/bgzip-compressed file (or STDIN with '-') as text
+def open_input(path):
+	if path == '-':
+		fin_raw = io.BufferedReader(sys.stdin.buffer)
+	else:
+		fin_raw = open(path, 'rb')
+	if fin_raw.peek(2)[:2] == b'\x1f\x8b': # gzip magic; bgzip files are multi-member gzip
+		fin_raw = gzip.GzipFile(fileobj=fin_raw, mode='rb')
+	return io.TextIOWrapper(fin_raw)
+
+#writer for BGZF (bgzip) files, i.e. a series of gzip members each holding <64Kb,
+# ending with the empty EOF block; readable by gzip, zcat, tabix, samtools faidx, etc.
+class BgzfWriter(object):
+	block_size = 65280 # same as bgzip
+	eof_block = b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00\x1b\x00\x03\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+	def __init__(self, path, level=6):
+		self.name = path
+		self.handle = open(path, 'wb')
+		self.level = level
+		self.buffer = []
+		self.buffered = 0
+	def write(self, text):
+		data = text.encode()
+		self.buffer.append(data)
+		self.buffered += len(data)
+		if self.buffered >= self.block_size:
+			data = b''.join(self.buffer)
+			while len(data) >= self.block_size:
+				self.write_block(data[:self.block_size])
+				data = data[self.block_size:]
+			self.buffer = [data]
+			self.buffered = len(data)
+	def write_block(self, data):
+		compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+		cdata = compressor.compress(data) + compressor.flush()
+		bsize = len(cdata) + 25 # 18 bytes header + 8 bytes trailer - 1
+		self.handle.write(b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00' + struct.pack('<H', bsize))
+		self.handle.write(cdata)
+		self.handle.write(struct.pack('<II', zlib.crc32(data) & 0xffffffff, len(data)))
+	def close(self):
+		data = b''.join(self.buffer)
+		if data:
+			self.write_block(data)
+		self.buffer = []
+		self.buffered = 0
+		self.handle.write(self.eof_block)
+		self.handle.close()
+
+#function to open the output of '-e' as plain text, BGZF (if ending with '.gz'), or STDOUT ('-')
+def open_output_gtf(path):
+	if path == '-':
+		return sys.stdout
+	elif path.endswith('.gz'):
+		return BgzfWriter(path)
+	else:
+		return open(path, 'w')
+
+#function to read transcript_id (or gene_id with '-g') from the 9th column of a line; returns "" if not found
+def get_geneID(ninthColumn):
+	geneID = ""
+	for record in ninthColumn.replace('\"','').split(';'):
+		record_tok = record.strip().split(' ')
+		if args.gene_id == True:
+			if record_tok[0] == 'gene_id' and len(record_tok) > 1:
+				geneID = record_tok[1]
+		else:
+			if record_tok[0] == 'transcript_id' and len(record_tok) > 1:
+				geneID = record_tok[1]
+	return geneID
+
+#function to describe <input.gtf> in the .tidx header, to tell whether the index is up-to-date
+def index_signature(path):
+	stat = os.stat(path)
+	return "#tidx\t%s\t%d\t%d" % ( 'gene_id' if args.gene_id else 'transcript_id', stat.st_size, stat.st_mtime_ns )
+
+#function to check whether <input.gtf> is a plain file that can be indexed and seeked
+def indexable(path):
+	if path == '-' or not os.path.isfile(path):
+		return False
+	with open(path, 'rb') as fin:
+		return fin.read(2) != b'\x1f\x8b'
+
+
+###############################################################
+### 1.0 with '-I' option, build the transcript index (.tidx) ###
+###############################################################
+index_path = args.input_gtf + ".tidx"
+if args.index:
+	if not indexable(args.input_gtf):
+		print( "Error: '-I' requires an uncompressed <input.gtf> file, not STDIN or .gz; exiting..." )
+		sys.exit(1)
+	print( "building the transcript index %s:" % index_path )
+	range_dict = dict() # key = geneID, value = list of [start, end) byte ranges in <input.gtf>
+	offset = 0
+	with open(args.input_gtf, 'rb') as fin_raw:
+		for bline in fin_raw:
+			tok = bline.split(b'\t')
+			if len(tok) >= 9:
+				geneID = get_geneID( tok[8].decode() )
+				if geneID != "":
+					if geneID not in range_dict:
+						range_dict[geneID] = [ [offset, offset + len(bline)] ]
+					elif range_dict[geneID][-1][1] == offset: # extend the range for consecutive lines
+						range_dict[geneID][-1][1] = offset + len(bline)
+					else:
+						range_dict[geneID].append( [offset, offset + len(bline)] )
+			offset += len(bline)
+	with open(index_path, 'w') as fout_index:
+		fout_index.write( index_signature(args.input_gtf) + '\n' )
+		for geneID in range_dict:
+			fout_index.write( geneID + '\t' + ','.join( "%d:%d" % (r[0], r[1] - r[0]) for r in range_dict[geneID] ) + '\n' )
+	print( "## indexed %d transcripts (geneIDs) in %d byte ranges" % ( len(range_dict), sum( len(r) for r in range_dict.values() ) ) )
+	range_dict.clear()
 
 
 #################################
@@ -126,7 +275,20 @@ nGene = 0
 nCDS = 0
 newline_accepted = 0
 
-print( "reading %s as the <input.gtf>:" % args.input_gtf.name )
+# with '-e', use the transcript index if present and up-to-date
+use_index = False
+if args.tID_list != "" and indexable(args.input_gtf) and os.path.isfile(index_path):
+	with open(index_path, 'r') as fin_index:
+		use_index = fin_index.readline().rstrip('\n') == index_signature(args.input_gtf)
+	if not use_index:
+		print( "%s is out-of-date or built with a different '-g' setting; run with '-I' to rebuild it" % index_path )
+
+fin_gtf = open_input(args.input_gtf)
+if args.tID_list != "":
+	fout_gtf = open_output_gtf(args.outfile)
+	if args.outfile == '-': # keep STDOUT for the filtered .gtf
+		sys.stdout = sys.stderr
+print( "reading %s as the <input.gtf>:" % input_gtf_name )
 
 
 #############################################################
@@ -144,27 +306,53 @@ if args.tID_list != "":
 		print( "Failed to read in %s, exiting..." % fin_tID_list.name )
 		sys.exit()
 	
-	# 1.5.2 print line to outfile if transcriptID is in the set
-	for line in args.input_gtf:
-		tok = line.replace('\"','').split('\t')
-		# read transcript_id (or gene_id if '-g' is on)
-		if len(tok) >= 9:
-			ninthColumn_records = tok[8].split(';')
-			for record in ninthColumn_records:
-				if args.gene_id == True:
-					if record.strip().split(' ')[0] == 'gene_id':
-						geneID = record.strip().split(' ')[1]
-						newline_accepted = 1			
-				else:
-					if record.strip().split(' ')[0] == 'transcript_id':
-						geneID = record.strip().split(' ')[1]
-						newline_accepted = 1
-			# filter the line that is present in the tID.list
-			if geneID in tID_set:
-				tID_processed_set.add(geneID)
-				args.outfile.write(line) # that's it!!
-		elif line[0] != '#': # ignore header line
-			print( "an invalid line detected in %s " % args.input_gtf.name ) # well, ignore anyway ...
+	# 1.5.2 with an up-to-date .tidx, read only the byte ranges of requested transcripts
+	if use_index:
+		print( "using the transcript index %s" % index_path )
+		ranges_2read = []
+		with open(index_path, 'r') as fin_index:
+			fin_index.readline() # skip the signature
+			for line in fin_index:
+				gID, ranges = line.rstrip('\n').split('\t', 1)
+				if gID in tID_set:
+					tID_processed_set.add(gID)
+					for r in ranges.split(','):
+						r_start, r_len = r.split(':')
+						ranges_2read.append( (int(r_start), int(r_len)) )
+		fin_gtf.close()
+		ranges_2read.sort() # keep the order of lines in <input.gtf>
+		with open(args.input_gtf, 'rb') as fin_raw:
+			for r_start, r_len in ranges_2read:
+				fin_raw.seek(r_start)
+				fout_gtf.write( fin_raw.read(r_len).decode() )
+
+	else:
+		# 1.5.3 otherwise, scan <input.gtf> and print line to outfile if transcriptID is in the set
+		for line in fin_gtf:
+			tok = line.replace('\"','').split('\t')
+			# read transcript_id (or gene_id if '-g' is on)
+			if len(tok) >= 9:
+				ninthColumn_records = tok[8].split(';')
+				for record in ninthColumn_records:
+					if args.gene_id == True:
+						if record.strip().split(' ')[0] == 'gene_id':
+							geneID = record.strip().split(' ')[1]
+							newline_accepted = 1			
+					else:
+						if record.strip().split(' ')[0] == 'transcript_id':
+							geneID = record.strip().split(' ')[1]
+							newline_accepted = 1
+				# filter the line that is present in the tID.list
+				if geneID in tID_set:
+					tID_processed_set.add(geneID)
+					fout_gtf.write(line) # that's it!!
+			elif line[0] != '#': # ignore header line
+				print( "an invalid line detected in %s " % input_gtf_name ) # well, ignore anyway ...
+		fin_gtf.close()
+	if args.outfile != '-':
+		fout_gtf.close()
+	else:
+		fout_gtf.flush()
 	for gID in tID_set:
 		if gID not in tID_processed_set:
 			print( "transcriptID (geneID) not found in the input.gtf: %s" % gID )
@@ -172,8 +360,69 @@ else:
 	###########################################
 	### 1.2 if '-e' option is off, continue ###
 	###########################################
-	for line in args.input_gtf:
+	## 1.2.1 with '-U' option, find chromosomes whose lines changed since the last run
+	chr_2parse_set = None # None = parse all chromosomes
+	if args.incremental:
+		if args.input_gtf == '-':
+			print( "Error: '-U' requires <input.gtf> to be a file, not STDIN; exiting..." )
+			sys.exit(1)
+		cache_path = outfile_name + ".chrcache"
+		cache_signature = "#chrcache\t%s\t%s" % ( 'gene_id' if args.gene_id else 'transcript_id', 'pc_only' if args.protein_coding else 'all' )
+		chr_hash_dict = dict() # key = chrID, value = md5 of its lines, in the order of <input.gtf>
+		chr_ranges_dict = dict() # key = chrID, value = list of [start, end) byte ranges in <input.gtf>
+		offset = 0
+		fin_hash = open_input(args.input_gtf)
+		for line in fin_hash.buffer:
+			if line[:1] != b'#': # ignore header lines
+				chrID = line.split(b'\t', 1)[0]
+				if chrID not in chr_hash_dict:
+					chr_hash_dict[chrID] = hashlib.md5()
+					chr_ranges_dict[chrID] = [ [offset, offset + len(line)] ]
+				elif chr_ranges_dict[chrID][-1][1] == offset: # extend the range for consecutive lines
+					chr_ranges_dict[chrID][-1][1] = offset + len(line)
+				else:
+					chr_ranges_dict[chrID].append( [offset, offset + len(line)] )
+				chr_hash_dict[chrID].update(line)
+			offset += len(line)
+		fin_hash.close()
+		chr_hash_dict = dict( (c.decode(), h.hexdigest()) for c, h in chr_hash_dict.items() )
+		chr_ranges_dict = dict( (c.decode(), r) for c, r in chr_ranges_dict.items() )
+		
+		cached_dict = dict() # key = chrID, value = [md5, nGene, nCDS, list of rows]
+		if os.path.isfile(cache_path):
+			with open(cache_path, 'r') as fin_cache:
+				if fin_cache.readline().rstrip('\n') == cache_signature:
+					for line in fin_cache:
+						if line[0] == '>':
+							tok = line[1:].rstrip('\n').split('\t')
+							cached_rows = []
+							cached_dict[ tok[0] ] = [ tok[1], int(tok[2]), int(tok[3]), cached_rows ]
+						else:
+							cached_rows.append(line)
+				else:
+					print( "%s was created with different '-g' or '-p' settings; parsing all chromosomes" % cache_path )
+		chr_2parse_set = set( c for c in chr_hash_dict if c not in cached_dict or cached_dict[c][0] != chr_hash_dict[c] )
+		print( "## %d of %d chromosomes changed since the last run with '-U' and will be parsed:" % ( len(chr_2parse_set), len(chr_hash_dict) ) )
+		nGene_chr_dict = dict() # key = chrID, value = number of gene models with 'exon' records
+		nCDS_chr_dict = dict() # key = chrID, value = number of gene models with 'CDS' records
+	
+	#function to read lines of the changed chromosomes only, from their byte ranges in an uncompressed <input.gtf>
+	def lines_in_ranges(path, ranges):
+		with open(path, 'rb') as fin_raw:
+			for r_start, r_end in ranges:
+				fin_raw.seek(r_start)
+				for line in io.TextIOWrapper( io.BytesIO( fin_raw.read(r_end - r_start) ) ): # same newline handling as open_input()
+					yield line
+	
+	lines_2parse = fin_gtf
+	if chr_2parse_set is not None and indexable(args.input_gtf):
+		lines_2parse = lines_in_ranges( args.input_gtf, sorted( r for c in chr_2parse_set for r in chr_ranges_dict[c] ) )
+	
+	## 1.2.2 parse the .gtf lines
+	for line in lines_2parse:
 		newline_accepted = 0
+		if chr_2parse_set is not None and line.split('\t', 1)[0] not in chr_2parse_set: # e.g. compressed <input.gtf>
+			continue
 		tok = line.replace('\"','').split('\t')
 		try:
 			chr = tok[0]
@@ -203,6 +452,8 @@ else:
 				mRNA_len_dict[geneID] = end - start + 1
 				mRNA_nExon_dict[geneID] = 1
 				nGene = nGene + 1
+				if args.incremental:
+					nGene_chr_dict[chr] = nGene_chr_dict.get(chr, 0) + 1
 			else:
 				mRNA_start_dict[geneID] = min(start, mRNA_start_dict[geneID])
 				mRNA_end_dict[geneID] = max(end, mRNA_end_dict[geneID])
@@ -217,26 +468,40 @@ else:
 				CDS_len_dict[geneID] = end - start + 1
 				CDS_nExon_dict[geneID] = 1
 				nCDS = nCDS + 1			
+				if args.incremental:
+					nCDS_chr_dict[chr] = nCDS_chr_dict.get(chr, 0) + 1
 			else:
 				CDS_start_dict[geneID] = min(start, CDS_start_dict[geneID])
 				CDS_end_dict[geneID] = max(end, CDS_end_dict[geneID])
 				CDS_len_dict[geneID] = CDS_len_dict[geneID] + end - start + 1
 				CDS_nExon_dict[geneID] = CDS_nExon_dict[geneID] + 1
 	
-	print( "## %d gene models with 'exon' records and %d with 'CDS' records were found in %s.\n" % (nGene, nCDS, args.input_gtf.name) )
-	args.input_gtf.close()
+	if args.incremental: # add counts of unchanged chromosomes
+		for c in chr_hash_dict:
+			if c not in chr_2parse_set:
+				nGene += cached_dict[c][1]
+				nCDS += cached_dict[c][2]
+	print( "## %d gene models with 'exon' records and %d with 'CDS' records were found in %s.\n" % (nGene, nCDS, input_gtf_name) )
+	fin_gtf.close()
 	
 	
 	###############################
 	### 2. writing <output.txt> ###
 	###############################
 	print( "writing to %s:" % outfile_name )
-	args.outfile.write("geneID\tChr\tStr\tmRNA_s\tmRNA_e\t#exon_mRNA\tmRNA_l\tCDS_s\tCDS_e\t#exon_CDS\tCDS_l\n")
+	fout_table = open(outfile_name, 'w')
+	fout_table.write("geneID\tChr\tStr\tmRNA_s\tmRNA_e\t#exon_mRNA\tmRNA_l\tCDS_s\tCDS_e\t#exon_CDS\tCDS_l\n")
+	
+	rows_chr_dict = dict() # key = chrID, value = list of rows; used with '-U'
+	def write_row(row):
+		fout_table.write(row)
+		if args.incremental:
+			rows_chr_dict.setdefault( row.split('\t', 2)[1], [] ).append(row)
 	
 	for key in sorted(chr_dict):
 		try:
 			if key in CDS_start_dict:		
-				args.outfile.write( key + '\t' + \
+				write_row( key + '\t' + \
 							chr_dict[key] + '\t' + \
 							str_dict[key] + '\t' + \
 							## if no records for mRNA, copy records from CDS
@@ -249,7 +514,7 @@ else:
 							str( CDS_nExon_dict[key] ) + '\t' + \
 							str( CDS_len_dict[key] ) + '\n' )
 			elif not args.protein_coding: # if '-p' option is on, skip those without CDS records
-				args.outfile.write( key + '\t' + \
+				write_row( key + '\t' + \
 							chr_dict[key] + '\t' + \
 							str_dict[key] + '\t' + \
 							## if no records for mRNA, copy records from CDS
@@ -266,7 +531,22 @@ else:
 			print( "Something bad just happened while writing, please troubleshoot :p" )
 	#	except KeyError :
 	#		print key		
-	args.outfile.close()
+	
+	## with -U option, copy rows of unchanged chromosomes from the cache and update the cache
+	if args.incremental:
+		for c in chr_hash_dict:
+			if c not in chr_2parse_set:
+				fout_table.writelines( cached_dict[c][3] )
+		with open(cache_path, 'w') as fout_cache:
+			fout_cache.write( cache_signature + '\n' )
+			for c in chr_hash_dict:
+				if c in chr_2parse_set:
+					fout_cache.write( ">%s\t%s\t%d\t%d\n" % ( c, chr_hash_dict[c], nGene_chr_dict.get(c, 0), nCDS_chr_dict.get(c, 0) ) )
+					fout_cache.writelines( rows_chr_dict.get(c, []) )
+				else:
+					fout_cache.write( ">%s\t%s\t%d\t%d\n" % ( c, chr_hash_dict[c], cached_dict[c][1], cached_dict[c][2] ) )
+					fout_cache.writelines( cached_dict[c][3] )
+	fout_table.close()
 	
 	## sort the output file
 	print( "sorting %s:" % outfile_name )
@@ -346,17 +626,19 @@ else:
 	## with -r option
 	elif args.report_overlap:
 		print( "\ndetecting overlapping transcripts (e.g. isoforms) in %s:" % outfile_name )
-	
+		if args.CDS_overlap:
+			print( "using CDS coordinates; transcripts without CDS records are ignored," )
+		
 		#initializing	
 		fin_output = open(outfile_name, "r")
-		prev_chr = ""
-		prev_strand = ""
-		prev_end = 0
-		chr = ""
-		strand = ""
-		mRNA_start = 0
-		mRNA_end = 0
+		if args.CDS_overlap: # which columns to use for start and end
+			index_se = [7, 8]
+		else:
+			index_se = [3, 4]
+		rows = [] # [chr_rank, start, end, chr, strand, geneID, line]
+		chr_rank_dict = dict() # key = chr, value = order of the chr in <output.txt>
 		num_overlap = 0
+		num_capped = 0
 		num_line = 0
 		
 		for line in fin_output:
@@ -365,27 +647,39 @@ else:
 				tok = line.split('\t')
 				chr = tok[1].strip()
 				strand = tok[2].strip()
-				mRNA_start = int(tok[3].strip())
-				mRNA_end = int(tok[4].strip())
-		# if you want to use CDS coordinates to detect overlaps
-		#		mRNA_start = int(tok[7].strip())
-		#		mRNA_end = int(tok[8].strip())
-				
-				if (chr == prev_chr) and (strand == prev_strand) and ( mRNA_start < prev_end):
-					num_overlap += 1
-					print( line.strip() + "\toverlap: %d in %d" % ( (prev_end - mRNA_start + 1), (mRNA_end - mRNA_start) ) )
-					
-				prev_chr = chr
-				prev_strand = strand
-				prev_end = mRNA_end
-		
+				if args.CDS_overlap and tok[7].strip() == "NA":
+					continue
+				mRNA_start = int(tok[ index_se[0] ].strip())
+				mRNA_end = int(tok[ index_se[1] ].strip())
+				if chr not in chr_rank_dict:
+					chr_rank_dict[chr] = len(chr_rank_dict)
+				rows.append( [ chr_rank_dict[chr], mRNA_start, mRNA_end, chr, strand, tok[0].strip(), line.strip() ] )
 			except (ValueError, IndexError) :
 				if num_line > 1 :
 					print( "line %d appears invalid" % num_line )
+		fin_output.close()
+		rows.sort( key = lambda r: (r[0], r[1]) ) # stable; keeps the order of <output.txt> with mRNA coordinates
 		
-		print( "\n## found %d overlapping entries" % num_overlap )
+		# sweep along each chr and strand, keeping transcripts that may still overlap in a heap keyed by their end
+		active_dict = dict() # key = (chr, strand), value = heap of [end, start, geneID]
+		for row in rows:
+			chr_rank, mRNA_start, mRNA_end, chr, strand, geneID, line = row
+			active = active_dict.setdefault( (chr, strand), [] )
+			while active and active[0][0] <= mRNA_start: # ended before this one starts
+				heapq.heappop(active)
+			# all remaining active transcripts overlap this one
+			partners = active
+			if args.max_overlaps > 0 and len(active) > args.max_overlaps: # keep the largest overlaps, then the nearest starts
+				partners = heapq.nsmallest( args.max_overlaps, active, key = lambda a: ( -min(a[0], mRNA_end), -a[1], a[2] ) )
+				num_capped += 1
+			for prev_end, prev_start, prev_geneID in partners:
+				num_overlap += 1
+				print( line + "\toverlap: %d in %d\twith: %s" % ( (min(prev_end, mRNA_end) - mRNA_start + 1), (mRNA_end - mRNA_start), prev_geneID ) )
+			heapq.heappush( active, [mRNA_end, mRNA_start, geneID] )
 		
-		fin_output.close()
+		print( "\n## found %d overlapping pairs" % num_overlap )
+		if num_capped > 0:
+			print( "## overlaps were capped for %d transcripts by '-k %d'" % (num_capped, args.max_overlaps) )
 	
 	## with -l or -L option 
 	elif args.cluster or args.Longest_ORF:
@@ -454,5 +748,11 @@ else:
 			subprocess.call("rm " + temp_filename , shell=True)
 		else:
 			subprocess.call("mv " + temp_filename + " " + outfile_name , shell=True)
+	
+	## with -b option
+	if args.binary:
+		from gtfParsed_binary import write_sidecar
+		print( "\nwriting the binary sidecar %s:" % (outfile_name + ".bin") )
+		print( "## wrote %d entries" % write_sidecar(outfile_name) )
 		
 print( "all done\n" )
\ No newline at end of file
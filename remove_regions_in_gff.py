@@ -3,8 +3,9 @@
 #20170603 ver 0.0
 #20170529 started writing
 
-import sys
+import sys, os, re
 import argparse
+from bisect import bisect_right
 from argparse import RawTextHelpFormatter
 
 ###################################################
@@ -17,10 +18,9 @@ synopsis2 = "detailed description:\n\
  1. Input files and parameters\n\
   - <list_length>: scfID (scaffoldID) and length, one per line;\n\
   - <list_2bRemoved>: scfID, start, and end, positions, one per line;\n\
-     regions should not overlap with others and be SORTED by start positions \n\
-     within a scaffold, if multiple regions to be removed in a scaffold;\n\
-  *** DON'T FORGET TO SORT <list_2bRemoved>!! For example, use:\n\
-       sort -k1,1 -k2,2n list_2bRemoved > tmp; mv tmp list_2bRemoved\n\
+     regions should not overlap with others; regions are grouped by scaffold\n\
+     and sorted by start positions internally, so <list_2bRemoved> does not\n\
+     need to be sorted;\n\
   - <input_gff>: genome annotation to be edited, in .gff format;\n\
   - all input should be tab-delimited text files.\n\
  2. Editing <input_gff>\n\
@@ -34,13 +34,52 @@ synopsis2 = "detailed description:\n\
  3. Output\n\
   - writes edited genome annotation to <output_gff>;\n\
   - writes coordinates of newly split scaffolds to <output_gff>.list; this list\n\
-     can be used to cut genome sequences using 'extract_seq.py'.\n\
+     can be used to cut genome sequences using 'extract_seq.py', or see '-g';\n\
+  - writes the same coordinates as a UCSC chain file (from the original to the\n\
+     new scaffolds) to <output_gff>.chain, e.g. for 'liftOver'.\n\
  4. Misc. note\n\
   - keeps only features complete included in new scaffolds, without considering\n\
-     parent-child relationship among features.\n\
- by ohdongha@gmail.com 20190527 ver 0.0.1\n"
+     parent-child relationship among features, unless '-p' is used.\n\
+ 5. '-p': keep or remove whole gene models (.gff3 only)\n\
+  - a gene model is a top-level feature (without 'Parent=') and all following\n\
+     features whose 'Parent=' refers to an 'ID=' in the model, e.g. a gene and\n\
+     its mRNAs, exons, and CDSs;\n\
+  - a model is kept only if all of its features can be kept, otherwise all of\n\
+     them are removed;\n\
+  - <input_gff> is read once and only the current model is kept in memory, so\n\
+     children should follow their parents (as in most .gff3 files); a feature\n\
+     whose Parent is not in the current model is processed as a separate model.\n\
+ 6. '-g <genome>': cut genome sequences in the same run\n\
+  - writes sequences of all scaffolds and sub-scaffolds in <output_gff>.list to\n\
+     <output_gff>.fa, with the same IDs and coordinates as in <output_gff>;\n\
+  - <genome> should be an uncompressed .fasta; its index (<genome>.fai, same\n\
+     as 'samtools faidx') is used if up-to-date, otherwise created, so only\n\
+     the sequences to be kept are read, with large buffered reads;\n\
+  - sequence lines are as long as in <genome>.\n\
+ 7. '-R <table>[:COLUMNS][:bed]': move other coordinate tables to the new scaffolds\n\
+  - each <table> (e.g. .bed, .vcf, blast tables) is streamed through the same\n\
+     per-scaffold index as <input_gff>; lines with positions completely included\n\
+     in a kept scaffold or sub-scaffold are written to <table>.remapped with new\n\
+     scfID and positions, and other lines to <table>.unmapped;\n\
+  - COLUMNS: columns (1-based) of scfID, start, and end, e.g. '1,2,3' for .bed\n\
+     or '1,2' for .vcf (no end column), '2,9,10' for the subject of blast\n\
+     tables; start > end (e.g. minus strand hits) is fine;\n\
+  - ':bed': start positions are 0-based, as in .bed;\n\
+  - each table has its own layout, e.g. '-R a.bed:1,2,3:bed -R b.vcf:1,2';\n\
+     '-k' and '-b' set COLUMNS and ':bed' for tables given without them;\n\
+  - '##contig=<ID=...>' header lines (.vcf) are rewritten, one for each kept\n\
+     scaffold or sub-scaffold with its new ID and length, and dropped for\n\
+     discarded scaffolds; other lines starting with '#' are copied to\n\
+     <table>.remapped unchanged.\n\
+ by ohdongha@gmail.com 20261019 ver 0.4.1\n"
 
 #version_history
+#20261019 ver 0.4.1 # columns and 0-based starts can be given per table with '-R <table>[:COLUMNS][:bed]'; '##contig' header lines rewritten for the new scaffolds
+#20261019 ver 0.4 # <output_gff>.chain is written; '-R', '-k', and '-b' options added to move coordinate tables to the new scaffolds
+#20261019 ver 0.3 # '-g' option added to write the cut genome sequences, using a faidx index of <genome>
+#20261019 ver 0.2 # '-p' option added to keep or remove whole gene models, reading <input_gff> once and buffering one model at a time
+#20261019 ver 0.1.1 # find the sub-scaffold of each feature by binary search on per-scaffold sorted start positions; no more empty line after each modified feature
+#20261019 ver 0.1 # group and sort regions to be removed by scaffold once, instead of scanning all regions for each scaffold; runs with python 3
 #20190527 ver 0.0.1 # the <output_gff>.list column order modified to have the new scaffold ID as the first column (so that it can be directly used by 'extract_seq.py'
 #20170603 ver 0.0
 
@@ -53,10 +92,41 @@ parser.add_argument('input_gff', type=argparse.FileType('r'), help=".gff file to
 parser.add_argument('output_gff', type=argparse.FileType('w'), help="output file; see below for details")
 
 parser.add_argument('-c', '--min_scaffold_len', type=int, default=1000, help="default=1000; see below") # 
+parser.add_argument('-p', '--parent_child', action="store_true", default=False, help="keep or remove whole gene models; see below") # v0.2
+parser.add_argument('-g', '--genome', type=str, default="", help="genome sequences in .fasta, to be cut and written to <output_gff>.fa; see below") # v0.3
+parser.add_argument('-R', '--remap', type=str, action="append", default=[], help="coordinate table to be moved to the new scaffolds, as <table>[:COLUMNS][:bed]; can be used multiple times; see below") # v0.4
+parser.add_argument('-k', '--remap_columns', type=str, default="1,2,3", help="columns of scfID, start, and end for '-R' tables given without COLUMNS; default=1,2,3") # v0.4
+parser.add_argument('-b', '--bed', action="store_true", default=False, help="start positions are 0-based, as in .bed, for '-R' tables given without ':bed'") # v0.4
 
 args = parser.parse_args()
 min_scf_len = args.min_scaffold_len
 
+#function to read 1-based columns of scfID, start, and (optionally) end, e.g. '1,2,3'; returns 0-based 
+#	(col_scfID, col_start, col_end), or exits if not valid
+def parse_remap_columns(columns, option):
+	try:
+		remap_columns = [ int(c) - 1 for c in columns.split(',') ]
+	except ValueError:
+		remap_columns = []
+	if len(remap_columns) not in (2, 3) or min(remap_columns) < 0:
+		print( "'%s' is not valid; give 1-based columns of scfID, start, and (optionally) end." % option )
+		sys.exit(1)
+	return remap_columns[0], remap_columns[1], remap_columns[-1]
+
+# tables for '-R', as a list of (table, (col_scfID, col_start, col_end), bed_shift); v0.4.1
+default_columns = parse_remap_columns( args.remap_columns, "-k " + args.remap_columns )
+remap_list = []
+for spec in args.remap:
+	fields = spec.split(':')
+	bed_shift = 1 if args.bed else 0 # to make 0-based start positions 1-based, only to locate them
+	if len(fields) > 1 and fields[-1] == "bed":
+		bed_shift = 1
+		fields.pop()
+	columns = default_columns
+	if len(fields) > 1 and re.match(r'^[0-9,]+$', fields[-1]):
+		columns = parse_remap_columns( fields.pop(), "-R " + spec )
+	remap_list.append( (':'.join(fields), columns, bed_shift) )
+
 ########################
 ### 1. reading lists ###
 ########################
@@ -71,7 +141,7 @@ for line in args.list_length:
 	try:
 		scf_len_dict[tok[0]] = int(tok[1].strip())
 	except (ValueError, IndexError) :
-		print "Line %d is not valid in %s." % (num_line, args.list_length.name)
+		print( "Line %d is not valid in %s." % (num_line, args.list_length.name) )
 
 args.list_length.close()
 
@@ -91,11 +161,18 @@ for line in args.list_2bRemoved:
 		region_2bRemoved_start_dict[num_regions_2bRemoved] = int(tok[1].strip())
 		region_2bRemoved_end_dict[num_regions_2bRemoved] = int(tok[2].strip())
 	except (ValueError, IndexError) :
-		print "Line %d is not valid in %s." % (num_line, args.list_2bRemoved.name)
+		print( "Line %d is not valid in %s." % (num_line, args.list_2bRemoved.name) )
 		num_regions_2bRemoved -= 1 # so that the wrong entries can be re-written with the next line
 
 args.list_2bRemoved.close()
 
+# 1.3 group regions to be removed by scaffold, sorted by start positions
+regions_2bRemoved_scf_dict = dict() # dict with key=scfID, value=list of regionIDs sorted by start positions
+for regionID in range(1, num_regions_2bRemoved + 1):
+	regions_2bRemoved_scf_dict.setdefault( region_2bRemoved_scfID_dict[regionID], [] ).append(regionID)
+for scfID in regions_2bRemoved_scf_dict:
+	regions_2bRemoved_scf_dict[scfID].sort( key = lambda regionID: (region_2bRemoved_start_dict[regionID], regionID) )
+
 #####################################################
 ### 2. editing <input_gff> and write <output_gff> ###
 #####################################################
@@ -113,10 +190,13 @@ new_scf_len = 0
 new_scf_start_dict = dict() # dict with key=new_scfID, value=start_position
 new_scf_end_dict = dict() # dict with key=new_scfID, value=end_position
 new_scf_offset_dict = dict() # dict with key=new_scfID, value=offset
+subscf_2keep_dict = dict() # dict with key=scfID, value=list of new_scfIDs kept, sorted by start positions
+subscf_2keep_start_dict = dict() # dict with key=scfID, value=list of start positions of new_scfIDs kept, for bisect
 
 
 # 2.1 create updated scfIDs and offset values for updated feature coordinates, and <output_gff>.list
 fout_chop_list = open(args.output_gff.name + ".list", "w")
+chop_list = [] # same as <output_gff>.list, for <output_gff>.chain and cutting <genome> with '-g'
  
 for scfID in sorted(scf_len_dict, key=scf_len_dict.get, reverse = True):
 
@@ -126,38 +206,41 @@ for scfID in sorted(scf_len_dict, key=scf_len_dict.get, reverse = True):
 	num_subscf_2keep = 0
 	
 	# start scanning; at first, keep all split sub-scaffolds regardless of the length
-	for	regionID in sorted(region_2bRemoved_scfID_dict): 
-		if region_2bRemoved_scfID_dict[regionID] == scfID:
-			num_subscf += 1		
-			new_scf_start = min(scan_position + 1, scf_len_dict[scfID])
-			new_scf_end = max(region_2bRemoved_start_dict[regionID] - 1, 1)
-			new_scf_len = new_scf_end - new_scf_start + 1
-			scan_position = region_2bRemoved_end_dict[regionID]
-
-			# now determine whether to keep the sub-scaffold
-			if new_scf_len >= min_scf_len :
-				num_subscf_2keep += 1
-				new_scfID = scfID + "_" + str(num_subscf_2keep).zfill(2)
-				new_scf_start_dict[new_scfID] = new_scf_start
-				new_scf_end_dict[new_scfID] = new_scf_end
-				new_scf_offset_dict[new_scfID] = new_scf_start - 1 
-				# when modifying feature coordinates, subtract offset value from original coordinates
-				scf_2modify_set.add(scfID)
-				subscf_2keep_set.add(new_scfID)
-				print "%s: %d ~ %d to be kept as %s (len %d >= %d)" \
-					% (scfID, new_scf_start, new_scf_end, new_scfID, new_scf_len, min_scf_len)
-#				fout_chop_list.write("%s\t%d\t%d\t%s\n" % (scfID, new_scf_start, new_scf_end, new_scfID))
-				fout_chop_list.write("%s\t%s\t%d\t%d\n" % (new_scfID, scfID, new_scf_start, new_scf_end)) # v0.1
-			elif new_scf_len > 1:
-				print "%s: %d ~ %d to be discarded (len %d < %d)" \
-					% (scfID, new_scf_start, new_scf_end, new_scf_len, min_scf_len)
+	for	regionID in regions_2bRemoved_scf_dict.get(scfID, []): 
+		num_subscf += 1		
+		new_scf_start = min(scan_position + 1, scf_len_dict[scfID])
+		new_scf_end = max(region_2bRemoved_start_dict[regionID] - 1, 1)
+		new_scf_len = new_scf_end - new_scf_start + 1
+		scan_position = region_2bRemoved_end_dict[regionID]
+
+		# now determine whether to keep the sub-scaffold
+		if new_scf_len >= min_scf_len :
+			num_subscf_2keep += 1
+			new_scfID = scfID + "_" + str(num_subscf_2keep).zfill(2)
+			new_scf_start_dict[new_scfID] = new_scf_start
+			new_scf_end_dict[new_scfID] = new_scf_end
+			new_scf_offset_dict[new_scfID] = new_scf_start - 1 
+			# when modifying feature coordinates, subtract offset value from original coordinates
+			scf_2modify_set.add(scfID)
+			subscf_2keep_set.add(new_scfID)
+			subscf_2keep_dict.setdefault(scfID, []).append(new_scfID)
+			subscf_2keep_start_dict.setdefault(scfID, []).append(new_scf_start)
+			print( "%s: %d ~ %d to be kept as %s (len %d >= %d)" \
+				% (scfID, new_scf_start, new_scf_end, new_scfID, new_scf_len, min_scf_len) )
+#			fout_chop_list.write("%s\t%d\t%d\t%s\n" % (scfID, new_scf_start, new_scf_end, new_scfID))
+			fout_chop_list.write("%s\t%s\t%d\t%d\n" % (new_scfID, scfID, new_scf_start, new_scf_end)) # v0.1
+			chop_list.append( (new_scfID, scfID, new_scf_start, new_scf_end) )
+		elif new_scf_len > 1:
+			print( "%s: %d ~ %d to be discarded (len %d < %d)" \
+				% (scfID, new_scf_start, new_scf_end, new_scf_len, min_scf_len) )
 		
 			
 	# after scan, deal with the end of the scaffold
 	if num_subscf == 0:
-		print "%s is unchanged." % scfID
+		print( "%s is unchanged." % scfID )
 #		fout_chop_list.write("%s\t%d\t%d\t%s\n" % (scfID, 1, scf_len_dict[scfID], scfID))
 		fout_chop_list.write("%s\t%s\t%d\t%d\n" % (scfID, scfID, 1, scf_len_dict[scfID]))
+		chop_list.append( (scfID, scfID, 1, scf_len_dict[scfID]) )
 	else:
 		num_subscf += 1
 		new_scf_start = min(scan_position + 1, scf_len_dict[scfID])
@@ -172,52 +255,278 @@ for scfID in sorted(scf_len_dict, key=scf_len_dict.get, reverse = True):
 			new_scf_offset_dict[new_scfID] = new_scf_start - 1 
 			scf_2modify_set.add(scfID)
 			subscf_2keep_set.add(new_scfID)
-			print "%s: %d ~ %d to be kept as %s (len %d >= %d)" \
-				% (scfID, new_scf_start, new_scf_end, new_scfID, new_scf_len, min_scf_len)
+			subscf_2keep_dict.setdefault(scfID, []).append(new_scfID)
+			subscf_2keep_start_dict.setdefault(scfID, []).append(new_scf_start)
+			print( "%s: %d ~ %d to be kept as %s (len %d >= %d)" \
+				% (scfID, new_scf_start, new_scf_end, new_scfID, new_scf_len, min_scf_len) )
 #			fout_chop_list.write("%s\t%d\t%d\t%s\n" % (scfID, new_scf_start, new_scf_end, new_scfID))
 			fout_chop_list.write("%s\t%s\t%d\t%d\n" % (new_scfID, scfID, new_scf_start, new_scf_end)) # v0.1
+			chop_list.append( (new_scfID, scfID, new_scf_start, new_scf_end) )
 		elif new_scf_len > 1:
-			print "%s: %d ~ %d to be discarded (len %d < %d)" \
-				% (scfID, new_scf_start, new_scf_end, new_scf_len, min_scf_len)
+			print( "%s: %d ~ %d to be discarded (len %d < %d)" \
+				% (scfID, new_scf_start, new_scf_end, new_scf_len, min_scf_len) )
 		
 		# check whether the scaffold can be safely discarded
 		if num_subscf_2keep == 0:
-			print "%s can be safely discarded; no regions left longer than %d." \
-				% (scfID, min_scf_len)
+			print( "%s can be safely discarded; no regions left longer than %d." \
+				% (scfID, min_scf_len) )
 			scf_2discard_set.add(scfID)
 			
 fout_chop_list.close()
 
+# 2.2 write <output_gff>.chain; one ungapped chain per scaffold or sub-scaffold, from the original to the new one
+with open(args.output_gff.name + ".chain", "w") as fout_chain:
+	for chainID, (new_scfID, scfID, new_scf_start, new_scf_end) in enumerate(chop_list, 1):
+		new_scf_len = new_scf_end - new_scf_start + 1
+		fout_chain.write( "chain %d %s %d + %d %d %s %d + 0 %d %d\n%d\n\n" \
+			% (new_scf_len, scfID, scf_len_dict[scfID], new_scf_start - 1, new_scf_end, new_scfID, new_scf_len, new_scf_len, chainID, new_scf_len) )
+
+
+# 2.3 process the <input_gff> and write <output_gff>
+#function to find where positions start ~ end of scfID go; returns (scfID, offset) of the scaffold or the kept 
+#	sub-scaffold that completely includes them, or None if they are to be removed
+def locate(scfID, start, end):
+	if scfID in scf_2modify_set :
+		# the only sub-scaffold that can include the feature is the last one starting at or before the feature
+		i = bisect_right(subscf_2keep_start_dict[scfID], start) - 1
+		if i >= 0:
+			new_scfID = subscf_2keep_dict[scfID][i]
+			# keep only features that completely included in the new_scf 
+			if new_scf_end_dict[new_scfID] >= end:
+				return new_scfID, new_scf_offset_dict[new_scfID]
+		return None
+	elif scfID not in scf_2discard_set :
+		return scfID, 0
+	return None
+
+#function to find where a feature goes, same as locate()
+def locate_feature(num_line, tok):
+	scfID = tok[0].strip()
+	if scfID in scf_2modify_set :
+		try:
+			return locate( scfID, int(tok[3]), int(tok[4]) )
+		except ValueError :
+			print( "unable to process line %d due to invalud fields," % num_line )
+			return None
+	return locate(scfID, 0, 0)
+
+#function to write a gene model (or a single feature), a list of (num_line, line, tok); all features are 
+#	written if each of them can be kept, otherwise none; returns True if written
+def write_model(model):
+	locations = []
+	for num_line, line, tok in model:
+		location = locate_feature(num_line, tok)
+		if location is None:
+			return False
+		locations.append(location)
+	for (num_line, line, tok), (scfID, offset) in zip(model, locations):
+		if scfID == tok[0].strip():
+			args.output_gff.write(line)
+		else:
+			tok[0] = scfID
+			tok[3] = str( int(tok[3]) - offset )
+			tok[4] = str( int(tok[4]) - offset )
+			args.output_gff.write('\t'.join(tok).rstrip('\n') + '\n')
+	return True
+
+#function to get ID and the list of Parent IDs from the 9th column of a .gff3 line
+def get_ID_Parent(ninthColumn):
+	featureID = ""
+	parentIDs = []
+	for attribute in ninthColumn.strip().split(';'):
+		key, sep, value = attribute.strip().partition('=')
+		if key == "ID":
+			featureID = value
+		elif key == "Parent":
+			parentIDs = value.split(',')
+	return featureID, parentIDs
 
-# 2.2 process the <input_gff> and write <output_gff>
 num_line = 0
+model = [] # with -p, lines of the current top-level feature and all its descendants
+model_IDs = set() # IDs of features in model
+num_models_kept = 0
+num_models_removed = 0
+num_orphans = 0 # features with Parent IDs not found in the current model
+
+#function to write or remove the current model with -p, count it, and start a new one
+def flush_model():
+	global model, model_IDs, num_models_kept, num_models_removed
+	if model:
+		if write_model(model):
+			num_models_kept += 1
+		else:
+			num_models_removed += 1
+	model = []
+	model_IDs = set()
 
 for line in args.input_gff:
 	num_line += 1
 	tok = line.split('\t')
-	scfID = tok[0].strip()
 	
 	# decision tree to process each line
 	if len(tok) != 9:
-		print "line %d contains only %d fields; print without processing," % (num_line, len(tok))
-		args.output_gff.write(line)
-	elif scfID in scf_2modify_set :
-		i = 1
-		while ( scfID + "_" + str(i).zfill(2) ) in subscf_2keep_set:
-			new_scfID = scfID + "_" + str(i).zfill(2)
-			try:
-				# keep only features that completely included in the new_scf 
-				if new_scf_start_dict[new_scfID] <= int(tok[3]) and \
-						new_scf_end_dict[new_scfID] >= int(tok[4]):
-					tok[0] = new_scfID
-					tok[3] = str( int(tok[3]) - new_scf_offset_dict[new_scfID] )
-					tok[4] = str( int(tok[4]) - new_scf_offset_dict[new_scfID] )
-					args.output_gff.write('\t'.join(tok) + '\n')
-			except (ValueError, IndexError) :	
-				print "unable to process line %d due to invalud fields," % num_line
-			i += 1
-	elif scfID not in scf_2discard_set :
+		flush_model()
+		print( "line %d contains only %d fields; print without processing," % (num_line, len(tok)) )
 		args.output_gff.write(line)
+	elif args.parent_child:
+		featureID, parentIDs = get_ID_Parent(tok[8])
+		# a new top-level feature (or an orphan) starts; flush the previous model
+		if not any( parentID in model_IDs for parentID in parentIDs ):
+			if parentIDs:
+				num_orphans += 1
+			flush_model()
+		model.append( (num_line, line, tok) )
+		if featureID:
+			model_IDs.add(featureID)
+	else:
+		write_model( [ (num_line, line, tok) ] )
+
+flush_model()
 
 args.output_gff.close()
-print "\ndone"
\ No newline at end of file
+
+###################################
+### 3. cutting <genome> with -g ###
+###################################
+READ_SIZE = 1 << 22 # bytes to read at once from <genome>
+
+#function to create the faidx index of a .fasta, as a list of (seqID, length, offset, line_bases, line_width)
+def build_fai(genome):
+	fai = []
+	seqID = None
+	offset = 0 # byte position in <genome>
+	with open(genome, 'rb') as fin:
+		for line in fin:
+			if line.startswith(b'>'):
+				if seqID is not None:
+					fai.append( (seqID, seq_len, seq_offset, line_bases, line_width) )
+				seqID = line[1:].split()[0].decode()
+				seq_len = 0
+				seq_offset = offset + len(line)
+				line_bases = 0
+				line_width = 0
+			elif seqID is not None:
+				if line_bases == 0:
+					line_bases = len( line.rstrip(b'\r\n') )
+					line_width = len(line)
+				seq_len += len( line.rstrip(b'\r\n') )
+			offset += len(line)
+	if seqID is not None:
+		fai.append( (seqID, seq_len, seq_offset, line_bases, line_width) )
+	return fai
+
+#function to read the faidx index of a .fasta, creating <genome>.fai if missing or out-of-date; returns a dict with key=seqID
+def read_fai(genome):
+	path_fai = genome + ".fai"
+	if os.path.isfile(path_fai) and os.path.getmtime(path_fai) >= os.path.getmtime(genome):
+		fai = []
+		with open(path_fai) as fin:
+			for line in fin:
+				tok = line.split('\t')
+				fai.append( (tok[0], int(tok[1]), int(tok[2]), int(tok[3]), int(tok[4])) )
+	else:
+		print( "creating the index of %s," % genome )
+		fai = build_fai(genome)
+		try:
+			with open(path_fai, 'w') as fout:
+				for entry in fai:
+					fout.write( "%s\t%d\t%d\t%d\t%d\n" % entry )
+		except IOError:
+			print( "unable to write %s; the index is used only for this run," % path_fai )
+	return dict( (entry[0], entry[1:]) for entry in fai )
+
+#function to copy positions start ~ end (1-based, inclusive) of a sequence in <genome> to fout as .fasta lines 
+def write_slice(fin, fout, fai_entry, start, end):
+	seq_len, seq_offset, line_bases, line_width = fai_entry
+	if line_bases == 0: # empty sequence
+		return
+	byte_start = seq_offset + (start - 1) // line_bases * line_width + (start - 1) % line_bases
+	byte_end = seq_offset + (end - 1) // line_bases * line_width + (end - 1) % line_bases + 1
+	fin.seek(byte_start)
+	remaining = byte_end - byte_start
+	carry = b''
+	while remaining > 0:
+		chunk = fin.read( min(READ_SIZE, remaining) )
+		if not chunk:
+			break
+		remaining -= len(chunk)
+		seq = carry + chunk.translate(None, b'\r\n')
+		num_full = len(seq) // line_bases * line_bases
+		if num_full > 0:
+			fout.write( b'\n'.join( seq[i : i + line_bases] for i in range(0, num_full, line_bases) ) + b'\n' )
+		carry = seq[num_full:]
+	if carry:
+		fout.write( carry + b'\n' )
+
+if args.genome != "":
+	fai_dict = read_fai(args.genome)
+	num_seq_written = 0
+	with open(args.genome, 'rb') as fin_genome, open(args.output_gff.name + ".fa", 'wb', READ_SIZE) as fout_genome:
+		for new_scfID, scfID, new_scf_start, new_scf_end in chop_list:
+			if scfID not in fai_dict:
+				print( "%s not found in %s; skipped," % (scfID, args.genome) )
+				continue
+			if fai_dict[scfID][0] != scf_len_dict[scfID]:
+				print( "%s is %d bp long in %s, but %d bp in %s," \
+					% (scfID, fai_dict[scfID][0], args.genome, scf_len_dict[scfID], args.list_length.name) )
+			fout_genome.write( (">%s\n" % new_scfID).encode() )
+			write_slice( fin_genome, fout_genome, fai_dict[scfID], new_scf_start, min(new_scf_end, fai_dict[scfID][0]) )
+			num_seq_written += 1
+	print( "\n%d sequences written to %s." % (num_seq_written, args.output_gff.name + ".fa") )
+
+########################################################
+### 4. moving coordinate tables to new scaffolds, -R ###
+########################################################
+new_scf_list_dict = dict() # dict with key=scfID, value=list of (new_scfID, length) kept, for '##contig' lines
+for new_scfID, scfID, new_scf_start, new_scf_end in chop_list:
+	new_scf_list_dict.setdefault(scfID, []).append( (new_scfID, new_scf_end - new_scf_start + 1) )
+contig_ID_pattern = re.compile(r'([<,]ID=)([^,>]+)')
+contig_length_pattern = re.compile(r'([<,]length=)([0-9]+)')
+
+#function to rewrite a '##contig=<ID=...>' header line for the new scaffolds; returns a list of lines, one for 
+#	each kept scaffold or sub-scaffold, an empty list if discarded, or the line itself if the ID is not listed
+def remap_contig(line):
+	match = contig_ID_pattern.search(line)
+	if match is None or match.group(2) not in scf_len_dict:
+		return [line]
+	new_lines = []
+	for new_scfID, new_scf_len in new_scf_list_dict.get(match.group(2), []):
+		new_line = contig_ID_pattern.sub( lambda m: m.group(1) + new_scfID, line, 1 )
+		new_lines.append( contig_length_pattern.sub( lambda m: m.group(1) + str(new_scf_len), new_line, 1 ) )
+	return new_lines
+
+for table, (col_scfID, col_start, col_end), bed_shift in remap_list:
+	num_remapped = 0
+	num_unmapped = 0
+	with open(table) as fin, open(table + ".remapped", "w") as fout_remapped, open(table + ".unmapped", "w") as fout_unmapped:
+		for line in fin:
+			if line.startswith("##contig=<"):
+				fout_remapped.write( ''.join( remap_contig(line) ) )
+				continue
+			elif line.startswith('#'):
+				fout_remapped.write(line)
+				continue
+			tok = line.rstrip('\n').split('\t')
+			try:
+				start = int(tok[col_start])
+				end = int(tok[col_end])
+				location = locate( tok[col_scfID].strip(), min(start, end) + bed_shift, max(start, end) )
+			except (ValueError, IndexError) :
+				location = None
+			if location is None:
+				fout_unmapped.write(line)
+				num_unmapped += 1
+				continue
+			tok[col_scfID] = location[0]
+			tok[col_start] = str( start - location[1] )
+			tok[col_end] = str( end - location[1] )
+			fout_remapped.write( '\t'.join(tok) + '\n' )
+			num_remapped += 1
+	print( "\n%s: %d lines remapped to %s, %d lines to %s." \
+		% (table, num_remapped, table + ".remapped", num_unmapped, table + ".unmapped") )
+
+if args.parent_child:
+	print( "\n%d gene models (top-level features with their descendants) kept, %d removed." % (num_models_kept, num_models_removed) )
+	if num_orphans > 0:
+		print( "%d features with Parent not found in the preceding top-level feature; processed as separate models." % num_orphans )
+print( "\ndone" )
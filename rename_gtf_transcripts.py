@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-import sys, subprocess, argparse
+import sys, os, re, struct, subprocess, multiprocessing, argparse
 from argparse import RawTextHelpFormatter
 
 ###################################################
@@ -8,17 +8,42 @@ from argparse import RawTextHelpFormatter
 synopsis1 = "synopsis:\n\
  - rename the 'transcript_id' field in the 9th column of a .gtf file, given a tab-delimited list of old and new transcript IDs.\n\
  - with '-e' option, can extract subset of transcripts.\n\
- - with '-g' option, can also rename 'gene_id' and 'gene_name' fields.\n"
+ - with '-g' option, can also rename 'gene_id' and 'gene_name' fields.\n\
+ - with '-b' option, can rename many .gtf files at once.\n\
+ - with '-f' option, can also rename IDs in .gff3 ('ID=' and 'Parent='), .fasta headers, and a column of tab-delimited files.\n"
 synopsis2 = "detailed description:\n\
  - based on <2bRenamed_list>, replace names of transcripts in <input_gtf> and and write to <output_gtf>.\n\
  - tab-delimited <2bRenamed_list> includes old and new transcript IDs; assume the transcript id not to be changed if no new ID given.\n\
- - from the 9th column of <input_gtf>, only 'transcript_id' field will be renamed and written to <output_gtf>\n\
+ - from the 9th column of <input_gtf>, only the value of 'transcript_id' field will be renamed in place; other fields are kept as they are, and lines not renamed are written to <output_gtf> unchanged.\n\
  - '-e'|'--extract': extract and rename only those transcripts included in <2bRenamed_list>; default behavior is to print all without renaming those not included.\n\
  - '-x'|'--exclude': extract only those transcripts NOT included in <2bRenamed_list>; does not perform renaming; [False]\n\
- - '-g'|'--gene_id': rename also 'gene_id' and 'gene_name' fields; <2bRenamed_list> should contain old and new transcript IDs, plus the new gene ID and gene name, tab-delimited and one entry per line.\n\n\
-by ohdongha@gmail.com 20211204 ver 0.4\n\n"
+ - '-g'|'--gene_id': rename also 'gene_id' and 'gene_name' fields; <2bRenamed_list> should contain old and new transcript IDs, plus the new gene ID and gene name, tab-delimited and one entry per line; the fields are added if missing.\n\
+ - '-b'|'--batch': rename all .gtf files given after '-b' instead of <input_gtf> (<input_gtf> and <output_gtf> are not given); each output is written next to its input, e.g. 'sample1.gtf' to 'sample1.renamed.gtf' (see '-s'), and the number of lines renamed is printed per file.\n\
+ - '-s'|'--suffix': with '-b', inserted before the extension of each output file name; ['renamed']\n\
+ - '-t'|'--threads': with '-b', number of processes renaming .gtf files in parallel; <2bRenamed_list> is read once and shared by the processes (by fork); [1]\n\
+ - '-w'|'--write_map': also write the mapping read from <2bRenamed_list> as a compact binary map to this file; the binary map can be given as <2bRenamed_list> in later runs, which is faster to read than a large text list; a binary map written with '-g' includes gene_id and gene_name.\n\
+ - '-f'|'--format': format of <input_gtf> or files given with '-b', one of [auto], gtf, gff3, fasta, or tsv; with 'auto', <input_gtf> is read as gtf,\n\
+     and the format of each file given with '-b' is found from its extension: .gff/.gff3 as gff3; .fa/.fasta/.fas/.fna/.faa/.ffn/.pep/.cds as fasta;\n\
+     .tsv/.tab as tsv; all others (including .txt) as gtf;\n\
+   - gff3: renames IDs in 'ID=' and 'Parent=' (all IDs in 'Parent=a,b'), e.g. a transcript and its exons and CDSs; '-g' is not used;\n\
+   - fasta: renames the sequence ID (the first word of the header); the rest of the header and the sequence are kept; with '-e' or '-x', extracts whole sequences;\n\
+   - tsv: renames IDs in a column (see '-c') of tab-delimited files, e.g. expression tables or blast results; '-g' is not used;\n\
+   - with '-b', a whole annotation (e.g. .gtf, .gff3, protein and CDS .fasta, and tables) can be renamed in one run, reading <2bRenamed_list> once.\n\
+ - '-c'|'--column': with tsv, the column (1-based) with IDs to be renamed; [1]\n\
+ - '-v'|'--validate': while renaming, check all IDs found in the files and write a report to this file, with:\n\
+   - collisions: new IDs given to more than one old ID in <2bRenamed_list>;\n\
+   - clashes: IDs not in <2bRenamed_list>, thus kept unchanged, that are the same as a new ID, per file;\n\
+   - unmapped: number of distinct IDs not in <2bRenamed_list>, per file;\n\
+   - unused: entries in <2bRenamed_list> whose old IDs were not found in any file.\n\
+ - '-l'|'--bloom': with '-v', count distinct unmapped IDs with a Bloom filter of this size (MB) instead of keeping all of them, for very large files;\n\
+     the numbers can be slightly smaller than the exact ones; [0] (not used)\n\n\
+by ohdongha@gmail.com 20261019 ver 0.8\n\n"
 
 #version_history
+#20261019 ver 0.8 # '-v' and '-l' options to check collisions, clashes, unmapped IDs, and unused entries while renaming
+#20261019 ver 0.7 # '-f' and '-c' options to rename IDs also in .gff3, .fasta headers, and a column of tab-delimited files
+#20261019 ver 0.6 # '-b', '-s', and '-t' options to rename many .gtf files in parallel processes; '-w' option to write a binary map, readable as <2bRenamed_list>
+#20261019 ver 0.5 # rename field values in place with precompiled regular expressions, keeping other fields; lines not renamed are copied without parsing
 #20211204 ver 0.4 # added '-g' option to rename also gene_id and gene_name fields
 #20211122 ver 0.3.1 # minimal modification to make it work with python 3
 #20180624 ver 0.3 # added an option to exclude transcripts in the list
@@ -56,97 +81,372 @@ by ohdongha@gmail.com 20211204 ver 0.4\n\n"
 parser = argparse.ArgumentParser(description = synopsis1, epilog = synopsis2, formatter_class = RawTextHelpFormatter)
 
 # positional parameters
-parser.add_argument('_2bRenamed_list', type=argparse.FileType('r'))
-parser.add_argument('input_gtf', type=argparse.FileType('r'))
-parser.add_argument('output_gtf', type=argparse.FileType('w'))
+parser.add_argument('_2bRenamed_list', type=str)
+parser.add_argument('input_gtf', type=argparse.FileType('r'), nargs='?')
+parser.add_argument('output_gtf', type=argparse.FileType('w'), nargs='?')
 
 # options
 parser.add_argument('-e', '--extract', action="store_true", default=False)
 parser.add_argument('-x', '--exclude', action="store_true", default=False)
 parser.add_argument('-g', '--gene_id', action="store_true", default=False)
+parser.add_argument('-b', '--batch', type=str, nargs='+', default=[])
+parser.add_argument('-s', '--suffix', type=str, default="renamed")
+parser.add_argument('-t', '--threads', type=int, default=1)
+parser.add_argument('-w', '--write_map', type=str, default="")
+parser.add_argument('-f', '--format', type=str, choices=["auto", "gtf", "gff3", "fasta", "tsv"], default="auto")
+parser.add_argument('-c', '--column', type=int, default=1)
+parser.add_argument('-v', '--validate', type=str, default="")
+parser.add_argument('-l', '--bloom', type=int, default=0)
 
 args = parser.parse_args()
+if args.batch and args.input_gtf is not None:
+	parser.error("<input_gtf> and <output_gtf> are not used with '-b'")
+if not args.batch and args.output_gtf is None:
+	parser.error("<input_gtf> and <output_gtf> are required without '-b'")
+if args.column < 1:
+	parser.error("'-c' should be 1 or larger")
 
 
 #######################################
 ### 1. reading in <_2bRenamed_list> ###
 #######################################
+MAP_MAGIC = b'RENAMEMAP1' # followed by #columns (2 or 4; 4 with '-g'), #entries, size of the text, and the text
+MAP_HEADER_FMT = '<10sIQQ'
+
+#function to write the mapping as a binary map; all IDs, column by column, '\0'-separated in a utf-8 text
+def write_map(path_map):
+	columns = [ list(transcriptID_dict), list(transcriptID_dict.values()) ]
+	if args.gene_id:
+		columns += [ [ geneID_dict[k] for k in columns[0] ], [ geneName_dict[k] for k in columns[0] ] ]
+	text = '\0'.join( '\0'.join(column) for column in columns ).encode()
+	with open(path_map, 'wb') as fout:
+		fout.write( struct.pack( MAP_HEADER_FMT, MAP_MAGIC, len(columns), len(transcriptID_dict), len(text) ) )
+		fout.write(text)
+
 transcriptID_dict = dict() # k = old transcript_id; v = new transcript_id
 if args.gene_id:
 	geneID_dict = dict()  # k = old transcript_id; v = new gene_id
 	geneName_dict = dict() # k = old transcript_id; v = new gene_name
 
-print( "reading %s as the <_2bRenamed_list>:" % args._2bRenamed_list.name )	
+print( "reading %s as the <_2bRenamed_list>:" % args._2bRenamed_list )	
 num_line = 0
 
-for line in args._2bRenamed_list:
-	tok = line.split('\t')
+fin_list = open(args._2bRenamed_list, 'rb')
+header = fin_list.read( struct.calcsize(MAP_HEADER_FMT) )
+if header.startswith(MAP_MAGIC):
+	# binary map written with '-w'
+	magic, num_columns, num_line, text_size = struct.unpack(MAP_HEADER_FMT, header)
+	if args.gene_id and num_columns < 4:
+		print( "## Error: with '-g' option, the binary map should be written with '-g'." )
+		sys.exit(1)
+	IDs = fin_list.read(text_size).decode().split('\0') if num_line > 0 else []
+	transcriptID_dict = dict( zip( IDs[ : num_line ], IDs[ num_line : 2 * num_line ] ) )
 	if args.gene_id:
-		try:
-			transcriptID_dict[tok[0].strip()] = tok[1].strip()
-			geneID_dict[tok[0].strip()] = tok[2].strip()
-			geneName_dict[tok[0].strip()] = tok[3].strip()
+		geneID_dict = dict( zip( IDs[ : num_line ], IDs[ 2 * num_line : 3 * num_line ] ) )
+		geneName_dict = dict( zip( IDs[ : num_line ], IDs[ 3 * num_line : ] ) )
+	del IDs
+	fin_list.close()
+else:
+	fin_list.close()
+	fin_list = open(args._2bRenamed_list, 'r')
+	for line in fin_list:
+		tok = line.split('\t')
+		if args.gene_id:
+			try:
+				oldID, newID, geneID, geneName = [ t.strip() for t in tok[ : 4 ] ]
+			except (ValueError) : # fewer than 4 columns
+				print("## Warning: with '-g' option, <2bRenamed_list> should have 4 columns; line ignored.")
+				continue
+			# assigned only after the line is validated, so that all three dicts have the same keys
+			transcriptID_dict[oldID] = newID
+			geneID_dict[oldID] = geneID
+			geneName_dict[oldID] = geneName
 			num_line += 1
-		except (IndexError) :
-			print("## Warning: with '-g' option, <2bRenamed_list> should have 4 columns; line ignored.")
-	else:
-		num_line += 1
-		try:
-			transcriptID_dict[tok[0].strip()] = tok[1].strip()
-		except (IndexError) :
-			transcriptID_dict[tok[0].strip()] = tok[0].strip()
-args._2bRenamed_list.close()
+		else:
+			num_line += 1
+			try:
+				transcriptID_dict[tok[0].strip()] = tok[1].strip()
+			except (IndexError) :
+				transcriptID_dict[tok[0].strip()] = tok[0].strip()
+	fin_list.close()
 print( "read %d entries." % num_line )
 
+if args.write_map != "":
+	write_map(args.write_map)
+	print( "wrote the binary map to %s." % args.write_map )
+
 ##########################################################
 ### 2. renaming <input_gtf> and writing to <output_gtf>###
 ##########################################################
-ninthColumn_records = ""
-ninthColumn_transcriptID = ""
-num_line = 0
-num_line_renamed = 0
-num_line_kept = 0
-
-print( "reading %s as the <input_gtf>:" % args.input_gtf.name )
-
-for line in args.input_gtf:
-	num_line += 1
-	tok = line.replace('\"','').split('\t')
-	if not args.exclude:
-		try:
-			ninthColumn_records = tok[8].split(';')
-			ninthColumn_transcriptID = "NA"
-			for record in ninthColumn_records:
-				if record.strip().split(' ')[0] == 'transcript_id':
-					ninthColumn_transcriptID = record.strip().split(' ')[1]
-			if ninthColumn_transcriptID in transcriptID_dict:
-				if args.gene_id:
-					tok[8] = 'transcript_id "' + transcriptID_dict[ninthColumn_transcriptID] + '";' \
-						+ 'gene_id "' + geneID_dict[ninthColumn_transcriptID] + '";' \
-						+ 'gene_name "' + geneName_dict[ninthColumn_transcriptID] + '"\n'
-				else:
-					tok[8] = 'transcript_id "' + transcriptID_dict[ninthColumn_transcriptID] + '";\n'
-				args.output_gtf.write('\t'.join(tok))
-				num_line_renamed += 1
-			elif args.extract == False:
-				args.output_gtf.write(line)
-				num_line_kept += 1
-		except (ValueError, IndexError) :
+# value of a field in the 9th column, e.g. 'TCONS_00000001|m.1' of 'transcript_id "TCONS_00000001|m.1";'
+TRANSCRIPT_ID_RE = re.compile(r'transcript_id\s+"?([^";\s]*)')
+GENE_ID_RE = re.compile(r'gene_id\s+"?([^";\s]*)')
+GENE_NAME_RE = re.compile(r'gene_name\s+"?([^";\s]*)')
+
+#function to find the first field in the 9th column matching field_re; e.g. 'ref_transcript_id' is not 'transcript_id'
+def search_field(line, field_re):
+	match = field_re.search(line)
+	while match and line[ match.start() - 1 ] not in '\t; ':
+		match = field_re.search( line, match.end() )
+	return match
+
+#function to replace the value of a field in place, or to add the field at the end of the 9th column if missing
+def replace_field(line, field_re, field, value):
+	match = search_field(line, field_re)
+	if match:
+		return line[ : match.start(1) ] + value + line[ match.end(1) : ]
+	line_body = line.rstrip('\r\n')
+	newline = line[ len(line_body) : ]
+	if not line_body.rstrip().endswith(';'):
+		line_body = line_body.rstrip() + ';'
+	return line_body + ' %s "%s";' % (field, value) + newline
+
+# validation with '-v'; all IDs found in a file are checked while renaming it
+class BloomFilter(object):
+	def __init__(self, num_bytes, num_hashes=4):
+		self.bits = bytearray(num_bytes)
+		self.num_bits = num_bytes * 8
+		self.num_hashes = num_hashes
+
+	# adds an ID; returns True if the ID was not in the filter (False can be a false positive)
+	def add(self, ID):
+		h = hash(ID)
+		h1 = h & 0xffffffff
+		h2 = ( (h >> 32) & 0xffffffff ) | 1
+		new = False
+		for i in range(self.num_hashes):
+			position = (h1 + i * h2) % self.num_bits
+			if not self.bits[ position >> 3 ] & ( 1 << (position & 7) ):
+				self.bits[ position >> 3 ] |= 1 << (position & 7)
+				new = True
+		return new
+
+class Validation(object):
+	def __init__(self):
+		self.used_IDs = set() # IDs in <2bRenamed_list> found in the file
+		self.clashes = set() # IDs kept unchanged in the file that are also new IDs
+		self.num_unmapped = 0 # number of distinct IDs in the file not in <2bRenamed_list>
+		if args.bloom > 0:
+			self.unmapped_IDs = BloomFilter(args.bloom * 1024 * 1024)
+		else:
+			self.unmapped_IDs = set()
+		self.last_ID = None
+
+	def check(self, ID):
+		if ID == self.last_ID: # e.g. exons of the same transcript
+			return
+		self.last_ID = ID
+		if ID in transcriptID_dict:
+			self.used_IDs.add(ID)
+			return
+		if ID in newID_set:
+			self.clashes.add(ID)
+		if args.bloom > 0:
+			self.num_unmapped += self.unmapped_IDs.add(ID)
+		elif ID not in self.unmapped_IDs:
+			self.unmapped_IDs.add(ID)
+			self.num_unmapped += 1
+
+	# summary to be returned from a worker process
+	def result(self):
+		return self.used_IDs, self.clashes, self.num_unmapped
+
+validation = None # Validation of the file being renamed, with '-v'
+if args.validate != "":
+	newID_set = set( transcriptID_dict.values() )
+
+# 'ID=' and 'Parent=' in the 9th column of a .gff3; Parent can have more than one ID separated by ','
+GFF3_ID_RE = re.compile(r'[\t;]\s*(?:ID|Parent)=([^;\r\n]*)')
+
+#function to rename transcript IDs in a .gtf; yields (line, renamed line or None if not in the list) per line, 
+#	or (None, None) for invalid lines
+def rename_gtf_lines(fin):
+	num_line = 0
+	for line in fin:
+		num_line += 1
+		if line.count('\t') < 8:
 			print( line.strip() + "\t:invalid_line_%d" % num_line )
-	else:
-		try:
-			ninthColumn_records = tok[8].split(';')
-			ninthColumn_transcriptID = "NA"
-			for record in ninthColumn_records:
-				if record.strip().split(' ')[0] == 'transcript_id':
-					ninthColumn_transcriptID = record.strip().split(' ')[1]
-			if ninthColumn_transcriptID not in transcriptID_dict:
-				args.output_gtf.write(line)
-				num_line_kept += 1
-		except (ValueError, IndexError) :
+			yield None, None
+			continue
+		match = search_field(line, TRANSCRIPT_ID_RE)
+		transcriptID = match.group(1) if match else "NA"
+		if validation and match:
+			validation.check(transcriptID)
+		if transcriptID in transcriptID_dict:
+			renamed = line[ : match.start(1) ] + transcriptID_dict[transcriptID] + line[ match.end(1) : ]
+			if args.gene_id:
+				renamed = replace_field( renamed, GENE_ID_RE, "gene_id", geneID_dict[transcriptID] )
+				renamed = replace_field( renamed, GENE_NAME_RE, "gene_name", geneName_dict[transcriptID] )
+			yield line, renamed
+		else:
+			yield line, None
+
+#function to rename IDs in 'ID=' and 'Parent=' of a .gff3, same as rename_gtf_lines()
+def rename_gff3_lines(fin):
+	num_line = 0
+	for line in fin:
+		num_line += 1
+		if line.startswith('#'):
+			yield line, None
+			continue
+		ninthColumn_start = line.rfind('\t') + 1
+		if ninthColumn_start == 0 or line.count('\t') < 8:
 			print( line.strip() + "\t:invalid_line_%d" % num_line )
+			yield None, None
+			continue
+		pieces = [] # pieces of the renamed line
+		position = ninthColumn_start
+		for match in GFF3_ID_RE.finditer(line, ninthColumn_start - 1):
+			IDs = match.group(1).split(',')
+			if validation:
+				for ID in IDs:
+					validation.check(ID)
+			if any( ID in transcriptID_dict for ID in IDs ):
+				pieces.append( line[ position : match.start(1) ] )
+				pieces.append( ','.join( transcriptID_dict.get(ID, ID) for ID in IDs ) )
+				position = match.end(1)
+		if pieces:
+			yield line, line[ : ninthColumn_start ] + ''.join(pieces) + line[ position : ]
+		else:
+			yield line, None
+
+#function to rename the first token (sequence ID) of .fasta headers, same as rename_gtf_lines(); 
+#	sequence lines follow their header
+def rename_fasta_lines(fin):
+	in_list = False
+	for line in fin:
+		if line.startswith('>'):
+			tok = line[1:].split(None, 1)
+			seqID = tok[0] if tok else ""
+			if validation:
+				validation.check(seqID)
+			in_list = seqID in transcriptID_dict
+			if in_list:
+				yield line, '>' + transcriptID_dict[seqID] + line[ line.index(seqID) + len(seqID) : ] # e.g. '> T1 desc'
+			else:
+				yield line, None
+		else:
+			yield line, (line if in_list else None)
+
+#function to rename IDs in the N-th column ('-c') of a tab-delimited table, same as rename_gtf_lines()
+def rename_tsv_lines(fin):
+	col_index = args.column - 1
+	for line in fin:
+		tok = line.split('\t')
+		if len(tok) > col_index:
+			ID = tok[col_index].rstrip('\r\n')
+			if validation:
+				validation.check(ID)
+			if ID in transcriptID_dict:
+				tok[col_index] = transcriptID_dict[ID] + tok[col_index][ len(ID) : ]
+				yield line, '\t'.join(tok)
+				continue
+		yield line, None
+
+RENAME_LINES = { "gtf" : rename_gtf_lines, "gff3" : rename_gff3_lines, "fasta" : rename_fasta_lines, "tsv" : rename_tsv_lines }
+FORMAT_EXTENSIONS = { ".gff" : "gff3", ".gff3" : "gff3", ".fa" : "fasta", ".fasta" : "fasta", ".fas" : "fasta", ".fna" : "fasta", \
+	".faa" : "fasta", ".ffn" : "fasta", ".pep" : "fasta", ".cds" : "fasta", ".tsv" : "tsv", ".tab" : "tsv" }
+
+#function to find the format of a file, from '-f' or, with '-b', the extension; .gtf if unknown
+def file_format(path):
+	if args.format != "auto":
+		return args.format
+	if not args.batch: # <input_gtf>
+		return "gtf"
+	return FORMAT_EXTENSIONS.get( os.path.splitext(path)[1].lower(), "gtf" )
+
+#function to rename a file in file_format, from fin to fout; returns the number of lines read, renamed/extracted, and untouched/kept
+def rename(fin, fout, file_format):
+	num_line = 0
+	num_line_renamed = 0
+	num_line_kept = 0
+	output_buffer = []
+	for line, renamed in RENAME_LINES[file_format](fin):
+		num_line += 1
+		if line is None: # invalid
+			continue
+		if args.exclude:
+			if renamed is None:
+				output_buffer.append(line)
+				num_line_kept += 1
+		elif renamed is not None:
+			output_buffer.append(renamed)
+			num_line_renamed += 1
+		elif args.extract == False:
+			output_buffer.append(line)
+			num_line_kept += 1
+		if len(output_buffer) >= 10000:
+			fout.write( ''.join(output_buffer) )
+			output_buffer = []
+	fout.write( ''.join(output_buffer) )
+	return num_line, num_line_renamed, num_line_kept
+
+#function to rename a file with '-b', writing the output next to it; runs in a worker process with '-t'
+def rename_file(path_gtf):
+	global validation
+	path_base, ext = os.path.splitext(path_gtf)
+	path_out = path_base + "." + args.suffix + ext
+	if args.validate != "":
+		validation = Validation()
+	with open(path_gtf, 'r') as fin, open(path_out, 'w') as fout:
+		counts = rename( fin, fout, file_format(path_gtf) )
+	return (path_gtf, path_out) + counts + ( validation.result() if validation else None, )
+
+#function to write the validation report with '-v'; results is a list of (file name, Validation.result())
+def write_report(path_report, results):
+	newIDs_dict = dict() # k = new transcript_id; v = list of old transcript_ids
+	for oldID, newID in transcriptID_dict.items():
+		newIDs_dict.setdefault(newID, []).append(oldID)
+	collisions = [ newID for newID in newIDs_dict if len( newIDs_dict[newID] ) > 1 ]
+	used_IDs = set()
+	for name, (used, clashes, num_unmapped) in results:
+		used_IDs |= used
+	unused_IDs = [ oldID for oldID in transcriptID_dict if oldID not in used_IDs ]
+	with open(path_report, 'w') as fout:
+		fout.write( "## collisions: new ID, and old IDs renamed to it\n" )
+		for newID in collisions:
+			fout.write( "%s\t%s\n" % ( newID, ','.join( newIDs_dict[newID] ) ) )
+		fout.write( "## clashes: file, and ID kept unchanged in the file that is also a new ID\n" )
+		for name, (used, clashes, num_unmapped) in results:
+			for ID in sorted(clashes):
+				fout.write( "%s\t%s\n" % (name, ID) )
+		fout.write( "## unmapped: file, and number of distinct IDs in the file not in <2bRenamed_list>%s\n" \
+			% ( " (approximate, '-l')" if args.bloom > 0 else "" ) )
+		for name, (used, clashes, num_unmapped) in results:
+			fout.write( "%s\t%d\n" % (name, num_unmapped) )
+		fout.write( "## unused: old and new IDs in <2bRenamed_list> not found in any file\n" )
+		for oldID in unused_IDs:
+			fout.write( "%s\t%s\n" % ( oldID, transcriptID_dict[oldID] ) )
+	print( "validation: %d new IDs with more than one old ID, %d IDs kept unchanged but also new IDs, %d entries in <2bRenamed_list> unused; written to %s." \
+		% ( len(collisions), sum( len(result[1]) for name, result in results ), len(unused_IDs), path_report ) )
+
+if args.batch:
+	if args.threads > 1:
+		pool = multiprocessing.get_context('fork').Pool(args.threads)
+		# largest files first, to keep all processes busy until the end
+		results = pool.imap_unordered( rename_file, sorted( args.batch, key = lambda f: -os.path.getsize(f) ) )
+	else:
+		results = map(rename_file, args.batch)
+	validation_results = []
+	for path_gtf, path_out, num_line, num_line_renamed, num_line_kept, validation_result in results:
+		print( "%s: out of %d lines, %d renamed/extracted, %d untouched/kept; written to %s." \
+			% (path_gtf, num_line, num_line_renamed, num_line_kept, path_out) )
+		validation_results.append( (path_gtf, validation_result) )
+	if args.threads > 1:
+		pool.close()
+		pool.join()
+	if args.validate != "":
+		write_report( args.validate, sorted( validation_results, key = lambda r: args.batch.index(r[0]) ) )
+	print( "done\n" )
+else:
+	print( "reading %s as the <input_gtf>:" % args.input_gtf.name )
+	if args.validate != "":
+		validation = Validation()
+	num_line, num_line_renamed, num_line_kept = rename( args.input_gtf, args.output_gtf, file_format(args.input_gtf.name) )
 
-print( "out of %d lines, %d renamed/extracted, %d untouched/kept." % (num_line, num_line_renamed, num_line_kept) )
-print( "done\n" )
-args.input_gtf.close()
-args.output_gtf.close()
+	print( "out of %d lines, %d renamed/extracted, %d untouched/kept." % (num_line, num_line_renamed, num_line_kept) )
+	if args.validate != "":
+		write_report( args.validate, [ (args.input_gtf.name, validation.result()) ] )
+	print( "done\n" )
+	args.input_gtf.close()
+	args.output_gtf.close()